@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Render Benchmark
+Compares the ways of drawing target shapes, offscreen (no window needed):
+  rotate  - build a surface per piece and pygame.transform.rotate it (original path)
+  cached  - the same rotated sprites served from an LRU sprite cache
+  vector  - rotated vertices from one NumPy batch, drawn with pygame.draw.polygon
+
+With --session it instead runs the whole game headless on a scripted
+session (pieces sliding into place, no camera) and reports draw time
+per frame section; --dump DIR also saves every frame as a PNG.
+
+Usage: python benchmark_render.py [frames] [--session SHAPE] [--dump DIR]
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import tangram_game
+from tangram_game import PYGAME_COLORS, WINDOW_WIDTH, WINDOW_HEIGHT, TangramGame, layout_areas
+from tangram_geometry import shape_bounds, fit_bounds
+from shapes_config import SHAPES
+from piece_renderer import target_polygons, draw_piece, render_piece_sprite
+from render_cache import SurfaceCache
+
+
+def display_transform(pieces, size=(WINDOW_WIDTH, WINDOW_HEIGHT)):
+    """(scale, offset) the game fits a shape to its game area with, for a window size"""
+    game_area = layout_areas(size)[0]
+    return fit_bounds(shape_bounds(pieces), tuple(game_area), TangramGame.FIT_MARGIN)
+
+
+def draw_rotate(surface, pieces, matched, transform, cache=None):
+    """Rotate-and-blit path, optionally through a sprite cache"""
+    scale, offset = transform
+    for piece in pieces:
+        color = PYGAME_COLORS[piece['color']]
+        angle = piece.get('angle', 0)
+        piece_type = piece.get('piece_type', '')
+        is_matched = piece['color'] in matched
+        center = (int(piece['center'][0] * scale + offset[0]),
+                  int(piece['center'][1] * scale + offset[1]))
+        if cache is None:
+            rotated = render_piece_sprite(piece_type, color, angle, is_matched, scale)
+        else:
+            rotated = cache.get((piece_type, color, angle, is_matched, scale),
+                                lambda: render_piece_sprite(piece_type, color, angle, is_matched, scale))
+        surface.blit(rotated, rotated.get_rect(center=center))
+
+
+def draw_vector(surface, pieces, matched, transform):
+    """Vector path: batch vertex computation, then polygons straight onto the surface"""
+    scale, offset = transform
+    for piece, points in zip(pieces, target_polygons(pieces, scale, offset)):
+        draw_piece(surface, points, PYGAME_COLORS[piece['color']], filled=piece['color'] in matched)
+
+
+def benchmark(name, draw, frames):
+    """Time draw() over every shape, half the pieces matched; returns ms per frame"""
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    shapes = [shape['pieces'] for shape in SHAPES.values()]
+    # Fitted once per shape, as the game caches them
+    transforms = [display_transform(pieces) for pieces in shapes]
+    start = time.perf_counter()
+    for frame in range(frames):
+        pieces = shapes[frame % len(shapes)]
+        matched = {p['color'] for p in pieces[:(frame // len(shapes)) % (len(pieces) + 1)]}
+        surface.fill((40, 40, 40))
+        draw(surface, pieces, matched, transforms[frame % len(shapes)])
+    per_frame = (time.perf_counter() - start) / frames * 1000
+    print(f"  {name:<8} {per_frame:7.3f} ms/frame")
+    return per_frame
+
+
+class ScriptedDetector:
+    """
+    Stands in for TangramDetector: the target pieces slide in from
+    scattered start positions and settle over the first part of the session
+    """
+
+    def __init__(self, target_pieces, clock, settle_time):
+        self.clock = clock
+        self.settle_time = settle_time
+        self.start = clock()
+        self.pieces = []
+        for i, p in enumerate(target_pieces):
+            piece_type = tangram_game.PieceType(p['piece_type'])
+            start = (60 + 80 * i, 420.0)
+            self.pieces.append((p['color'], piece_type, start, p['center'], p.get('angle', 0)))
+
+    def detect_pieces(self):
+        t = min((self.clock() - self.start) / self.settle_time, 1.0)
+        return [
+            tangram_game.TangramPiece(color, (x0 + (x1 - x0) * t, y0 + (y1 - y0) * t), angle * t, None, 0.0, piece_type)
+            for color, piece_type, (x0, y0), (x1, y1), angle in self.pieces
+        ]
+
+    def release(self):
+        pass
+
+
+class FakeClock:
+    """Time source that advances one display frame per tick()"""
+
+    def __init__(self, fps):
+        self.step = 1.0 / fps
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def tick(self):
+        self.now += self.step
+
+
+def benchmark_session(frames, shape, dump_dir=None):
+    """Run the game headless for a scripted session; prints ms per frame by section"""
+    clock = FakeClock(tangram_game.FPS)
+    target = SHAPES[shape]['pieces']
+    detector = ScriptedDetector(target, clock, settle_time=0.6 * frames / tangram_game.FPS)
+    game = tangram_game.TangramGame(detector=detector, time_source=clock, headless=True,
+                                    watch_shapes=False, threaded_detection=False)
+    game.current_shape = shape
+    game.reset_game()
+    if dump_dir:
+        os.makedirs(dump_dir, exist_ok=True)
+
+    totals = dict.fromkeys(game.DRAW_SECTIONS, 0.0)
+    worst = 0.0
+    for frame in range(frames):
+        game.update()
+        game.draw()
+        for section, seconds in game.draw_timings.items():
+            totals[section] += seconds
+        worst = max(worst, sum(game.draw_timings.values()))
+        if dump_dir:
+            pygame.image.save(game.screen, os.path.join(dump_dir, f"frame_{frame:05d}.png"))
+        clock.tick()
+
+    print(f"Headless session '{shape}', {frames} frames (final score {game.stabilizer.smoothed_score:.0f}%):")
+    for section, seconds in totals.items():
+        print(f"  {section:<8} {seconds / frames * 1000:7.3f} ms/frame")
+    print(f"  {'total':<8} {sum(totals.values()) / frames * 1000:7.3f} ms/frame (worst {worst * 1000:.3f} ms)")
+    if dump_dir:
+        print(f"  frames saved to {dump_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen rendering benchmark")
+    parser.add_argument('frames', nargs='?', type=int, default=2000)
+    parser.add_argument('--session', metavar='SHAPE', help="run the game headless on a scripted session")
+    parser.add_argument('--dump', metavar='DIR', help="save session frames as PNGs in DIR")
+    args = parser.parse_args()
+    frames = args.frames
+    pygame.init()
+
+    if args.session:
+        benchmark_session(frames, args.session, args.dump)
+        pygame.quit()
+        return
+
+    pygame.display.set_mode((1, 1))
+    print(f"Target shape rendering, {frames} frames over {len(SHAPES)} shapes:")
+    rotate = benchmark('rotate', draw_rotate, frames)
+    cache = SurfaceCache(max_size=128)
+    cached = benchmark('cached', lambda s, p, m, t: draw_rotate(s, p, m, t, cache), frames)
+    vector = benchmark('vector', draw_vector, frames)
+    print(f"  vector is {rotate / vector:.1f}x faster than rotate, "
+          f"{cached / vector:.1f}x vs cached ({cache.stats()})")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
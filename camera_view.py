@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Camera picture-in-picture view
+Shows what the detector sees inside the game window, with detected
+contours drawn on top. Frames are downscaled once and converted into a
+preallocated RGB buffer that a pygame surface shares, so no surface is
+allocated or copied per frame.
+"""
+
+import cv2
+import numpy as np
+import pygame
+from typing import Dict, Sequence, Tuple
+
+BACKGROUND_LABEL_COLOR = (30, 30, 30)
+
+
+class CameraView:
+    """
+    Picture-in-picture panel for camera frames or the detector's label image.
+    update() renders into the shared buffer; draw() blits it.
+    """
+
+    MODES = ('off', 'camera', 'labels')
+
+    def __init__(self, size: Tuple[int, int] = (240, 180), colors: Dict[str, Tuple[int, int, int]] = None,
+                 label_names: Sequence[str] = ()):
+        """
+        size: panel size in pixels
+        colors: RGB per piece color, for contours and the label image
+        label_names: color names in label order (label i + 1 is label_names[i])
+        """
+        self.size = size
+        self.colors = colors or {}
+        self.mode = 'off'
+        width, height = size
+        self._bgr = np.zeros((height, width, 3), dtype=np.uint8)
+        self._labels = np.zeros((height, width), dtype=np.uint8)
+        self.rgb = np.zeros((height, width, 3), dtype=np.uint8)
+        # The surface reads straight from self.rgb; keep both alive together
+        self.surface = pygame.image.frombuffer(self.rgb, size, 'RGB')
+        self.palette = np.zeros((256, 3), dtype=np.uint8)
+        self.palette[0] = BACKGROUND_LABEL_COLOR
+        for i, name in enumerate(label_names):
+            self.palette[i + 1] = self.colors.get(name, (255, 255, 255))
+        self.has_frame = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def next_mode(self) -> str:
+        """Cycle off -> camera -> labels -> off"""
+        self.mode = self.MODES[(self.MODES.index(self.mode) + 1) % len(self.MODES)]
+        return self.mode
+
+    def update(self, frame, pieces=(), labels=None):
+        """
+        Render the latest camera frame (BGR) or label image into the panel,
+        then outline each detected piece's contour in its color
+        """
+        if frame is None:
+            return
+        if self.mode == 'labels' and labels is not None:
+            cv2.resize(labels, self.size, dst=self._labels, interpolation=cv2.INTER_NEAREST)
+            np.take(self.palette, self._labels, axis=0, out=self.rgb)
+        else:
+            cv2.resize(frame, self.size, dst=self._bgr, interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+
+        scale_x = self.size[0] / frame.shape[1]
+        scale_y = self.size[1] / frame.shape[0]
+        for piece in pieces:
+            if piece.contour is None:
+                continue
+            points = (piece.contour.reshape(-1, 2) * (scale_x, scale_y)).astype(np.int32)
+            cv2.polylines(self.rgb, [points], True, self.colors.get(piece.color, (255, 255, 255)), 1)
+        self.has_frame = True
+
+    def draw(self, surface, pos):
+        """Blit the panel with a border at pos (top-left); returns the rect touched"""
+        rect = pygame.Rect(pos, self.size)
+        if self.has_frame:
+            surface.blit(self.surface, rect)
+        else:
+            surface.fill((0, 0, 0), rect)
+        return pygame.draw.rect(surface, (255, 255, 255), rect.inflate(4, 4), 2)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Detection worker - runs camera capture and piece detection off the render thread
+A background thread reads and processes camera frames at the detection
+rate; the game loop picks up the latest result between frames with
+take(), so a blocking cap.read() or a slow detection never delays a frame
+and the display keeps its own rate.
+"""
+
+import threading
+import time
+from typing import Callable
+
+
+class DetectionWorker:
+    """
+    Calls detect() on its own thread, DETECTION_FPS times a second on
+    average. Only the latest result is kept for take(); results the game
+    didn't take in time are replaced. A failed detection is reported and
+    the worker carries on with the next one.
+    """
+
+    def __init__(self, detect: Callable, rate: float, time_source: Callable[[], float] = time.time):
+        """
+        detect: captures and processes one frame; its return value is what take() hands over
+        rate: detections per second
+        time_source: clock for scheduling and result timestamps (the game's clock)
+        """
+        self.detect = detect
+        self.interval = 1.0 / rate
+        self.time = time_source
+        self.detections = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start detecting in the background"""
+        self._thread = threading.Thread(target=self._run, name="DetectionWorker", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """Worker thread: detect on a fixed schedule"""
+        next_time = self.time()
+        while not self._stop.is_set():
+            now = self.time()
+            if now < next_time:
+                self._stop.wait(next_time - now)
+                continue
+            # Keep to the rate on average, without catching up after stalls
+            next_time = max(next_time + self.interval, now)
+            try:
+                result = self.detect()
+            except Exception as e:
+                print(f"Warning: Detection failed: {e}")
+                continue
+            with self._lock:
+                self._pending = (result, now)
+            self.detections += 1
+
+    def take(self):
+        """(result, capture time) of the latest detection not taken yet, or None (for the main thread)"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
+
+    def stop(self):
+        """Stop detecting and wait for a detection in progress"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
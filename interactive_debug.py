@@ -7,6 +7,8 @@ import pygame
 import sys
 import json
 
+from piece_renderer import target_polygons, draw_piece
+
 # Swan shape data
 SWAN_PIECES = [
     {"color": "red", "center": [305, 290], "angle": 225, "piece_type": "large_triangle"},
@@ -50,9 +52,8 @@ modes = ["rotation_offset", "x_offset", "y_offset", "rotation_multiplier", "nega
 mode_names = ["Rotation Offset", "X Position Offset", "Y Position Offset", "Rotation Multiplier", "Negative Rotation"]
 current_mode = 0
 
-def draw_piece(surface, piece_data, rot_offset, x_off, y_off, rot_mult, use_neg):
-    """Draw a single piece with adjustments"""
-    color = COLORS[piece_data['color']]
+def adjust_piece(piece_data, rot_offset, x_off, y_off, rot_mult, use_neg):
+    """Return a copy of a piece with the debug adjustments applied"""
     center = [piece_data['center'][0] + x_off, piece_data['center'][1] + y_off]
     angle = piece_data['angle']
     
@@ -61,57 +62,17 @@ def draw_piece(surface, piece_data, rot_offset, x_off, y_off, rot_mult, use_neg)
     if use_neg:
         angle = -angle
     
-    piece_type = piece_data['piece_type']
-    
-    # Determine size
-    if 'large' in piece_type:
-        size = 60
-    elif 'medium' in piece_type:
-        size = 45
-    elif 'small' in piece_type:
-        size = 30
-    else:
-        size = 40
-    
-    # Create surface
-    surf_size = size * 3
-    surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA)
-    surf_center = surf_size // 2
-    
-    # Draw shape
-    if 'triangle' in piece_type:
-        # RIGHT-ANGLED triangle (matching shape editor)
-        points = [
-            (surf_center - size//2, surf_center - size//2),  # Top-left (right angle)
-            (surf_center + size//2, surf_center - size//2),  # Top-right
-            (surf_center - size//2, surf_center + size//2)   # Bottom-left
-        ]
-        pygame.draw.polygon(surf, color, points, 0)
-        pygame.draw.polygon(surf, (255, 255, 255), points, 2)
-    elif 'parallelogram' in piece_type:
-        # Parallelogram slanting LEFT (matching shape editor)
-        points = [
-            (surf_center + size//2, surf_center - size//2),
-            (surf_center - size//2, surf_center - size//2),
-            (surf_center - size - size//2, surf_center + size//2),
-            (surf_center - size//2, surf_center + size//2)
-        ]
-        pygame.draw.polygon(surf, color, points, 0)
-        pygame.draw.polygon(surf, (255, 255, 255), points, 2)
-    else:  # square
-        rect_pos = (surf_center - size//2, surf_center - size//2)
-        pygame.draw.rect(surf, color, (*rect_pos, size, size), 0)
-        pygame.draw.rect(surf, (255, 255, 255), (*rect_pos, size, size), 2)
-    
-    # Rotate
-    rotated = pygame.transform.rotate(surf, angle)
-    rotated_rect = rotated.get_rect(center=center)
-    
-    surface.blit(rotated, rotated_rect)
-    
-    # Draw angle label
-    label = font_small.render(f"{piece_data['color']} {int(angle)}°", True, (200, 200, 200))
-    surface.blit(label, (center[0] + 5, center[1] - 15))
+    return dict(piece_data, center=center, angle=angle)
+
+def draw_pieces(surface, pieces):
+    """Draw all pieces as rotated polygons (vertices computed in one batch)"""
+    for piece_data, points in zip(pieces, target_polygons(pieces)):
+        draw_piece(surface, points, COLORS[piece_data['color']], filled=True)
+        
+        # Draw angle label
+        center = piece_data['center']
+        label = font_small.render(f"{piece_data['color']} {int(piece_data['angle'])}°", True, (200, 200, 200))
+        surface.blit(label, (center[0] + 5, center[1] - 15))
 
 def draw_instructions(surface):
     """Draw control instructions"""
@@ -221,9 +182,11 @@ while running:
     screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT - 50))
     
     # Draw all pieces
-    for piece in SWAN_PIECES:
-        draw_piece(screen, piece, rotation_offset, x_offset, y_offset, 
-                   rotation_multiplier, use_negative_rotation)
+    draw_pieces(screen, [
+        adjust_piece(piece, rotation_offset, x_offset, y_offset,
+                     rotation_multiplier, use_negative_rotation)
+        for piece in SWAN_PIECES
+    ])
     
     # Draw instructions
     draw_instructions(screen)
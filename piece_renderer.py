@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Vector piece renderer
+Draws rotated tangram pieces straight onto a surface as polygons,
+with all vertices computed in one NumPy batch (no surface rotation)
+"""
+
+import pygame
+from typing import Dict, List, Sequence
+
+from tangram_geometry import piece_polygons
+
+WHITE = (255, 255, 255)
+
+
+def target_polygons(pieces: Sequence[Dict], scale: float = 1.0, offset=(0, 0)) -> List[list]:
+    """
+    Screen-space vertices for every piece of a shapes_config-style list.
+    Centers are scaled and offset like draw_target_shape; outlines are
+    scaled by the same factor. Triangles come back with three vertices.
+    """
+    if not pieces:
+        return []
+    types = [p.get('piece_type', '') for p in pieces]
+    centers = [(p['center'][0] * scale + offset[0], p['center'][1] * scale + offset[1]) for p in pieces]
+    angles = [p.get('angle', 0) for p in pieces]
+    batch = piece_polygons(types, centers, angles, scale)
+    return [
+        [tuple(v) for v in (vertices[:3] if 'triangle' in piece_type else vertices)]
+        for piece_type, vertices in zip(types, batch.tolist())
+    ]
+
+
+def draw_piece(surface, points, color, filled=True, outline_width=5):
+    """
+    Draw one piece polygon. Filled pieces get a white border with an
+    antialiased edge; unfilled pieces are drawn as a thick colored outline.
+    Returns the rect touched.
+    """
+    if filled:
+        rect = pygame.draw.polygon(surface, color, points, 0)
+        pygame.draw.polygon(surface, WHITE, points, 2)
+        pygame.draw.aalines(surface, WHITE, True, points)
+        return rect
+    return pygame.draw.polygon(surface, color, points, outline_width)
+
+
+def render_piece_sprite(piece_type, color, angle, is_matched, display_scale=1.0):
+    """
+    Render one target piece onto its own surface and rotate it
+    (the rotate-and-blit path; blit the result centered on the piece)
+    """
+    # Determine size based on piece type (also scaled)
+    if 'large' in piece_type:
+        size = int(60 * display_scale)
+    elif 'medium' in piece_type:
+        size = int(45 * display_scale)
+    elif 'small' in piece_type:
+        size = int(30 * display_scale)
+    else:  # square or parallelogram
+        size = int(40 * display_scale)
+    
+    # Create surface for drawing rotated shape
+    surf_size = size * 3  # Large enough for rotation
+    surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA)
+    surf_center = surf_size // 2
+    
+    # Draw shape on surface
+    if 'triangle' in piece_type:
+        # Draw RIGHT-ANGLED triangle (matching shape editor)
+        points = [
+            (surf_center - size//2, surf_center - size//2),
+            (surf_center + size//2, surf_center - size//2),
+            (surf_center - size//2, surf_center + size//2)
+        ]
+        if is_matched:
+            # FILLED - piece is correctly placed!
+            pygame.draw.polygon(surf, color, points, 0)
+            pygame.draw.polygon(surf, (255, 255, 255), points, 2)
+        else:
+            # OUTLINE ONLY - piece not matched yet
+            pygame.draw.polygon(surf, color, points, 5)
+        
+    elif 'parallelogram' in piece_type:
+        # Draw parallelogram slanting LEFT
+        points = [
+            (surf_center + size//2, surf_center - size//2),
+            (surf_center - size//2, surf_center - size//2),
+            (surf_center - size - size//2, surf_center + size//2),
+            (surf_center - size//2, surf_center + size//2)
+        ]
+        if is_matched:
+            pygame.draw.polygon(surf, color, points, 0)
+            pygame.draw.polygon(surf, (255, 255, 255), points, 2)
+        else:
+            pygame.draw.polygon(surf, color, points, 5)
+        
+    else:  # square
+        rect_pos = (surf_center - size//2, surf_center - size//2)
+        if is_matched:
+            pygame.draw.rect(surf, color, (*rect_pos, size, size), 0)
+            pygame.draw.rect(surf, (255, 255, 255), (*rect_pos, size, size), 2)
+        else:
+            pygame.draw.rect(surf, color, (*rect_pos, size, size), 5)
+    
+    # Rotate surface (positive angle = counter-clockwise, matching shape editor)
+    return pygame.transform.rotate(surf, angle)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Render caches for the Pygame display
+Bounded LRU caches for pre-rendered surfaces, with hit/miss counters
+"""
+
+import pygame
+from collections import OrderedDict
+
+
+class SurfaceCache:
+    """
+    Bounded LRU cache of ready-to-blit surfaces.
+    get() returns the cached surface for a key, building it with the
+    given factory on a miss and evicting the least recently used entry
+    once max_size is exceeded.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, factory):
+        """Return the surface for key, calling factory() to build it on a miss"""
+        surface = self._entries.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = factory()
+        self._entries[key] = surface
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        """Drop all cached surfaces (counters are kept)"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> str:
+        """One-line summary for logs"""
+        return (f"{len(self)}/{self.max_size} entries, {self.hits} hits, "
+                f"{self.misses} misses, {self.evictions} evictions ({self.hit_rate:.0%} hit rate)")
+
+
+class TextCache(SurfaceCache):
+    """Bounded LRU cache of rendered text keyed by (font, string, color)"""
+
+    def __init__(self, max_size=256):
+        super().__init__(max_size)
+
+    def render(self, font, text, color, antialias=True):
+        """Cached equivalent of font.render(text, antialias, color)"""
+        return self.get((font, text, color, antialias), lambda: font.render(text, antialias, color))
+
+
+class GlyphAtlas:
+    """
+    Pre-rendered glyphs for rapidly changing numbers (scores, timers).
+    All glyphs are rendered once side by side into one atlas surface;
+    drawing a string is then one small blit per character.
+    """
+
+    def __init__(self, font, chars, color, antialias=True):
+        self.font = font
+        self.color = color
+        glyphs = [font.render(ch, antialias, color) for ch in chars]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max(glyph.get_height() for glyph in glyphs)
+        self.atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.rects = {}
+        x = 0
+        for ch, glyph in zip(chars, glyphs):
+            # Adding onto the transparent atlas copies the glyph's pixels exactly
+            self.atlas.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_ADD)
+            self.rects[ch] = glyph.get_rect(topleft=(x, 0))
+            x += glyph.get_width()
+        self.height = height
+
+    def width(self, text) -> int:
+        """Width of text drawn from the atlas"""
+        return sum(self.rects[ch].width for ch in text)
+
+    def blit(self, surface, text, pos):
+        """Draw text at pos (top-left); returns the covered rect"""
+        x, y = pos
+        for ch in text:
+            rect = self.rects[ch]
+            surface.blit(self.atlas, (x, y), rect)
+            x += rect.width
+        return surface.get_rect().clip((pos[0], y, x - pos[0], self.height))
@@ -5,10 +5,14 @@ Create custom animal shapes by placing pieces on the canvas
 """
 
 import pygame
-import json
 import math
+import os
 from typing import List, Tuple, Dict, Optional
 
+from shape_journal import ShapeJournal
+from shape_store import ShapeStore, DEFAULT_DATABASE
+from shape_schema import validate_shape, ShapeFormatError
+
 # Initialize Pygame
 pygame.init()
 
@@ -148,6 +152,9 @@ class ShapeEditor:
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Tangram Shape Editor")
         self.clock = pygame.time.Clock()
+        self.journal = ShapeJournal('shapes.json')
+        # Once a shape database exists the game reads only that
+        self.store = ShapeStore(DEFAULT_DATABASE) if os.path.exists(DEFAULT_DATABASE) else None
         
         # Editor state
         self.pieces: List[EditorPiece] = []
@@ -358,28 +365,20 @@ class ShapeEditor:
     
     def save_shape(self):
         """Save current shape to library"""
-        if len(self.pieces) != 7:
-            print(f"Warning: Shape should have 7 pieces, has {len(self.pieces)}")
-        
-        shape_data = {
-            'name': self.shape_name,
-            'difficulty': self.difficulty,
-            'pieces': [piece.to_dict() for piece in self.pieces]
-        }
-        
-        # Load existing shapes
+        key = self.shape_name.lower().replace(' ', '_')
         try:
-            with open('shapes.json', 'r', encoding='utf-8') as f:
-                shapes = json.load(f)
-        except FileNotFoundError:
-            shapes = {}
-        
-        # Add new shape
-        shapes[self.shape_name.lower().replace(' ', '_')] = shape_data
+            shape_data = validate_shape(key, {
+                'name': self.shape_name,
+                'difficulty': self.difficulty,
+                'pieces': [piece.to_dict() for piece in self.pieces]
+            })
+        except ShapeFormatError as e:
+            print(f"Shape not saved: {e}")
+            return
         
-        # Save
-        with open('shapes.json', 'w', encoding='utf-8') as f:
-            json.dump(shapes, f, indent=2, ensure_ascii=False)
+        # One-shape upsert: a row in the database, or a line appended to
+        # the library's journal (no rewrite of shapes.json)
+        (self.store or self.journal).upsert(key, shape_data)
         
         print(f"Shape '{self.shape_name}' saved successfully!")
     
@@ -2,7 +2,7 @@
 Enhanced Tangram Shape Editor
 - Right-click drag to move pieces
 - Mouse scroll to rotate pieces
-- Press 'S' to save current configuration
+- Press 'S' to save current configuration (name and difficulty are typed in the window)
 - Press number keys 1-4 to load preset shapes
 - Press 'N' to create new shape
 """
@@ -10,8 +10,64 @@ Enhanced Tangram Shape Editor
 import cv2
 import numpy as np
 import math
-import json
-from datetime import datetime
+import time
+
+from shape_schema import validate_shape, ShapeFormatError
+from tangram_game import ShapeLibrary
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+class TextPrompt:
+    """
+    One line of text entry drawn in the OpenCV window. Keys come from the
+    editor's waitKey() loop, so the window keeps redrawing while it is open.
+    """
+    ENTER_KEYS = (10, 13)
+    BACKSPACE_KEYS = (8, 127)
+    ESCAPE_KEY = 27
+    
+    def __init__(self, label, text="", choices=None):
+        self.label = label
+        self.text = text
+        self.choices = choices  # If given, only these answers are accepted
+        self.error = ""
+    
+    def handle_key(self, key):
+        """Returns True when confirmed, False when cancelled, None while typing"""
+        if key in self.ENTER_KEYS:
+            text = self.text.strip()
+            if not text:
+                self.error = "Please type something"
+            elif self.choices and text.lower() not in self.choices:
+                self.error = f"Choose one of: {', '.join(self.choices)}"
+            else:
+                self.text = text.lower() if self.choices else text
+                return True
+        elif key == self.ESCAPE_KEY:
+            return False
+        elif key in self.BACKSPACE_KEYS:
+            self.text = self.text[:-1]
+        elif 32 <= key < 127:
+            self.text += chr(key)
+            self.error = ""
+        return None
+    
+    def draw(self, canvas):
+        """Draw the prompt box centered on the canvas"""
+        height, width = canvas.shape[:2]
+        left, top, right, bottom = 100, height // 2 - 60, width - 100, height // 2 + 60
+        cv2.rectangle(canvas, (left, top), (right, bottom), (255, 255, 255), -1)
+        cv2.rectangle(canvas, (left, top), (right, bottom), (0, 0, 200), 2)
+        cv2.putText(canvas, self.label, (left + 15, top + 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (50, 50, 50), 1)
+        cursor = "_" if int(time.time() * 2) % 2 == 0 else ""
+        cv2.putText(canvas, self.text + cursor, (left + 15, top + 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        hint = self.error or "Enter: OK   Esc: cancel"
+        cv2.putText(canvas, hint, (left + 15, bottom - 12),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 200) if self.error else (120, 120, 120), 1)
+
 
 class TangramPiece:
     """Represents a single tangram piece"""
@@ -129,19 +185,27 @@ class ShapeEditor:
         self.selected_piece = None
         self.drag_start = None
         self.current_shape_name = "custom"
+        self.current_difficulty = "medium"
+        
+        # The game's view of the shapes: the shape database if there is one,
+        # else the shape files with the journal of shapes.json. Saving (after
+        # asking for name and difficulty in the window) writes one shape to it
+        self.library = ShapeLibrary(pack_file=None)
+        self.prompts = []
+        self.prompt_index = 0
+        self.status = None  # (message, time shown)
         
         # Window name
         self.window_name = "Tangram Shape Editor"
         
     def load_shape(self, shape_name):
-        """Load a shape from shapes_config"""
+        """Load a shape from the library the game loads, including shapes saved here"""
         try:
-            from shapes_config import SHAPES, COLOR_MAP, PIECE_TYPE_MAP
-            if shape_name not in SHAPES:
+            shape_data = self.library.shapes.get(shape_name)
+            if shape_data is None:
                 print(f"Shape '{shape_name}' not found!")
                 return
             
-            shape_data = SHAPES[shape_name]
             pieces_data = shape_data["pieces"]
             
             # Map colors to piece indices
@@ -165,12 +229,36 @@ class ShapeEditor:
                     self.pieces[idx].rotation = piece_data["angle"]
             
             self.current_shape_name = shape_name
+            self.current_difficulty = shape_data.get("difficulty", "medium")
             print(f"Loaded shape: {shape_name}")
         except Exception as e:
             print(f"Error loading shape: {e}")
     
-    def save_shape(self):
-        """Save current configuration to shapes_config.py in the new format"""
+    def start_save(self):
+        """Ask for the shape's name and difficulty in the window, then save"""
+        self.prompts = [
+            TextPrompt("Shape name", self.current_shape_name),
+            TextPrompt("Difficulty (easy/medium/hard)", self.current_difficulty, choices=DIFFICULTIES),
+        ]
+        self.prompt_index = 0
+    
+    def handle_prompt_key(self, key):
+        """Feed a key to the open prompt; saves once the last one is confirmed"""
+        result = self.prompts[self.prompt_index].handle_key(key)
+        if result is None:
+            return
+        if result is False:
+            self.prompts = []
+            self.set_status("Save cancelled")
+            return
+        self.prompt_index += 1
+        if self.prompt_index == len(self.prompts):
+            name, difficulty = (prompt.text for prompt in self.prompts)
+            self.prompts = []
+            self.save_shape(name, difficulty)
+    
+    def save_shape(self, name=None, difficulty=None):
+        """Save the current configuration as one shape in the shape library"""
         # Color names for each piece
         color_names = ["red", "green", "blue", "yellow", "purple", "teal", "orange"]
         piece_type_names = [
@@ -178,15 +266,9 @@ class ShapeEditor:
             "small_triangle", "small_triangle", "square", "parallelogram"
         ]
         
-        # Get shape name and difficulty from user
-        print(f"\nCurrent shape name: '{self.current_shape_name}'")
-        print("Enter new shape name (or press Enter to keep current): ", end='')
-        new_name = input().strip()
-        if new_name:
-            self.current_shape_name = new_name
-        
-        print("Enter difficulty (easy/medium/hard) [default: medium]: ", end='')
-        difficulty = input().strip() or "medium"
+        name = (name or self.current_shape_name).strip()
+        difficulty = difficulty or self.current_difficulty
+        key = name.lower().replace(' ', '_')
         
         # Build the shape data in new format
         pieces_data = []
@@ -198,102 +280,36 @@ class ShapeEditor:
                 "piece_type": piece_type_names[i]
             })
         
-        # Build the new shape entry as a formatted string
-        shape_str = f'    "{self.current_shape_name}": {{\n'
-        shape_str += f'        "name": "{self.current_shape_name.capitalize()}",\n'
-        shape_str += f'        "difficulty": "{difficulty}",\n'
-        shape_str += '        "pieces": [\n'
-        
-        for piece_data in pieces_data:
-            shape_str += '            {\n'
-            shape_str += f'                "color": "{piece_data["color"]}",\n'
-            shape_str += f'                "center": {piece_data["center"]},\n'
-            shape_str += f'                "angle": {piece_data["angle"]},\n'
-            shape_str += f'                "piece_type": "{piece_data["piece_type"]}"\n'
-            shape_str += '            },\n'
-        
-        shape_str += '        ]\n'
-        shape_str += '    }'
-        
-        # Read current config file
         try:
-            with open('shapes_config.py', 'r') as f:
-                content = f.read()
-            
-            # Find the SHAPES dictionary
-            shapes_start = content.find('SHAPES = {')
-            if shapes_start == -1:
-                print("Error: Could not find SHAPES dictionary in config file")
-                return
-            
-            # Check if shape already exists
-            shape_pattern = f'"{self.current_shape_name}":'
-            if shape_pattern in content:
-                # Replace existing shape
-                print(f"Updating existing shape '{self.current_shape_name}'...")
-                # Find the shape entry
-                start = content.find(f'"{self.current_shape_name}":')
-                if start != -1:
-                    # Find the end of this shape
-                    brace_count = 0
-                    pos = content.find('{', start)
-                    end = pos
-                    bracket_count = 0
-                    in_shape = False
-                    
-                    while pos < len(content):
-                        if content[pos] == '{':
-                            brace_count += 1
-                            in_shape = True
-                        elif content[pos] == '[':
-                            bracket_count += 1
-                        elif content[pos] == ']':
-                            bracket_count -= 1
-                        elif content[pos] == '}':
-                            brace_count -= 1
-                            if brace_count == 0 and bracket_count == 0:
-                                end = pos + 1
-                                break
-                        pos += 1
-                    
-                    # Find start of the entry (including the key)
-                    entry_start = content.rfind('\n', 0, start) + 1
-                    # Check if there's a comma after
-                    next_newline = content.find('\n', end)
-                    if next_newline != -1 and ',' in content[end:next_newline]:
-                        end = content.find(',', end) + 1
-                    
-                    # Replace
-                    new_content = content[:entry_start] + shape_str + ',\n' + content[end:]
-                    # Remove double commas if any
-                    new_content = new_content.replace(',,', ',')
-            else:
-                # Add new shape
-                print(f"Adding new shape '{self.current_shape_name}'...")
-                # Find the last closing brace of SHAPES dict
-                last_brace = content.rfind('}', 0, content.rfind('}'))
-                insert_pos = content.rfind('\n', 0, last_brace) + 1
-                new_content = content[:insert_pos] + ',\n\n' + shape_str + '\n' + content[insert_pos:]
-                # Clean up formatting
-                new_content = new_content.replace(': {,', ': {')
-            
-            # Write back to file
-            with open('shapes_config.py', 'w') as f:
-                f.write(new_content)
-            
-            print(f"✓ Shape '{self.current_shape_name}' saved successfully!")
-            
-        except Exception as e:
+            shape = validate_shape(key, {
+                "name": name[:1].upper() + name[1:],
+                "difficulty": difficulty,
+                "pieces": pieces_data
+            })
+        except ShapeFormatError as e:
             print(f"Error saving shape: {e}")
-            import traceback
-            traceback.print_exc()
-            # Fallback: save to a JSON file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"shape_{self.current_shape_name}_{timestamp}.json"
-            import json
-            with open(filename, 'w') as f:
-                json.dump({"pieces": pieces_data}, f, indent=2)
-            print(f"Saved to backup file: {filename}")
+            self.set_status(f"Not saved: {e}")
+            return
+        
+        # One row or one journal line for this shape; nothing else is rewritten
+        # (the shape database saves the shape on assignment)
+        shapes = self.library.shapes
+        updating = key in shapes
+        shapes[key] = shape
+        if self.library.store is not None:
+            saved_to = self.library.store.path
+        else:
+            self.library.journal.upsert(key, shape)
+            saved_to = self.library.journal.journal_path
+        print(f"✓ Shape '{key}' {'updated' if updating else 'added'} in {saved_to}")
+        
+        self.current_shape_name = key
+        self.current_difficulty = difficulty
+        self.set_status(f"Saved '{key}'")
+    
+    def set_status(self, message):
+        """Show a message at the bottom of the window for a few seconds"""
+        self.status = (message, time.time())
     
     def draw(self):
         """Draw all pieces on the canvas"""
@@ -341,6 +357,14 @@ class ShapeEditor:
         cv2.putText(self.canvas, f"Shape: {self.current_shape_name}", (10, self.height - 10),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 200), 2)
         
+        # Last save result, for a few seconds
+        if self.status and time.time() - self.status[1] < 4:
+            cv2.putText(self.canvas, self.status[0], (300, self.height - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 120, 0), 2)
+        
+        if self.prompts:
+            self.prompts[self.prompt_index].draw(self.canvas)
+        
         return self.canvas
     
     def mouse_callback(self, event, x, y, flags, param):
@@ -402,10 +426,14 @@ class ShapeEditor:
             
             key = cv2.waitKey(1) & 0xFF
             
-            if key == 27:  # ESC
+            if self.prompts:
+                # Typing a name or difficulty: keys go to the prompt
+                if key != 255:
+                    self.handle_prompt_key(key)
+            elif key == 27:  # ESC
                 break
             elif key == ord('s') or key == ord('S'):
-                self.save_shape()
+                self.start_save()
             elif key == ord('n') or key == ord('N'):
                 self.current_shape_name = "custom"
                 print("Creating new shape...")
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Generator - random puzzles for the shape library
+Builds random arrangements of the seven pieces on an edge-snapping
+lattice: each new piece is turned so one of its edges lies along an edge
+of a piece already placed, with the edges' ends (or midpoints) snapped
+together, and is kept only if it overlaps nothing. Every arrangement is
+therefore connected and overlap-free.
+
+Arrangements are deduplicated by a canonical hash (the same puzzle moved
+or turned by 45 degree steps hashes the same), rated easy / medium / hard
+and saved to the shape database in one transaction. Generation runs in
+batches across a process pool.
+
+Usage: python shape_generator.py [COUNT] [--workers N] [--seed S] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from shape_schema import EDITOR_PIECES, validate_shape
+from shape_store import open_shape_store
+from tangram_geometry import piece_outline, rotation_matrices, polygon_area, convex_intersection_area
+
+PIECES = list(EDITOR_PIECES.values())  # (color, piece type)
+ANGLES = tuple(range(0, 360, 45))
+SNAP_MODES = ('start', 'end', 'middle')
+SNAP_ATTEMPTS = 40  # Tries to place each piece before the arrangement is abandoned
+OVERLAP_TOLERANCE = 1.0  # Square pixels of overlap treated as touching (rounding)
+CONTACT_DISTANCE = 0.5  # Edges this close count as shared
+BATCH_SIZE = 200  # Arrangements tried per pool task
+STALL_BATCHES = 100  # Give up after this many batches in a row without a new shape
+SHAPE_CENTER = (400.0, 300.0)  # Generated shapes are centered here, like the hand-made ones
+
+# Difficulty from rate_difficulty(): below EASY_BELOW is easy, below HARD_FROM medium.
+# Set at the thirds of the scores of random arrangements.
+EASY_BELOW = 0.66
+HARD_FROM = 0.72
+
+
+def _outline(piece_type) -> np.ndarray:
+    """Piece outline without the triangles' repeated vertex, positive signed area"""
+    points = []
+    for point in piece_outline(piece_type).tolist():
+        if point not in points:
+            points.append(point)
+    if polygon_area(points) < 0:
+        points.reverse()
+    return np.array(points)
+
+
+OUTLINES = {piece_type: _outline(piece_type) for _, piece_type in PIECES}
+
+
+def piece_polygon(piece_type, center, angle) -> np.ndarray:
+    """Vertices of a placed piece (positive signed area)"""
+    return OUTLINES[piece_type] @ rotation_matrices([angle])[0] + np.asarray(center, dtype=np.float64)
+
+
+def _direction(a, b) -> float:
+    """Direction of the edge a -> b in degrees"""
+    return math.degrees(math.atan2(b[1] - a[1], b[0] - a[0]))
+
+
+def _snap(piece_type, edge, target, mode) -> Tuple[np.ndarray, float]:
+    """
+    (center, angle) that lay edge `edge` of a piece along the target edge
+    (p, q), running the other way as between neighbouring polygons
+    """
+    outline = OUTLINES[piece_type]
+    u, v = outline[edge], outline[(edge + 1) % len(outline)]
+    p, q = target
+    # Rotating by angle turns directions by -angle (see rotation_matrices)
+    angle = (_direction(u, v) - _direction(q, p)) % 360
+    angle = round(angle / 45) * 45 % 360
+    rotation = rotation_matrices([angle])[0]
+    u, v = u @ rotation, v @ rotation
+    if mode == 'start':
+        center = p - v
+    elif mode == 'end':
+        center = q - u
+    else:
+        center = (p + q) / 2 - (u + v) / 2
+    return center, angle
+
+
+def _bounds(polygon):
+    x0, y0 = polygon.min(axis=0)
+    x1, y1 = polygon.max(axis=0)
+    return x0, y0, x1, y1
+
+
+def _overlaps(polygon, placed) -> bool:
+    """Whether a polygon overlaps any placed one (bounding boxes first)"""
+    x0, y0, x1, y1 = _bounds(polygon)
+    subject = [tuple(point) for point in polygon.tolist()]
+    for other, (ox0, oy0, ox1, oy1) in placed:
+        if x1 <= ox0 or ox1 <= x0 or y1 <= oy0 or oy1 <= y0:
+            continue
+        if convex_intersection_area(subject, [tuple(point) for point in other.tolist()]) > OVERLAP_TOLERANCE:
+            return True
+    return False
+
+
+def random_arrangement(rng: random.Random) -> Optional[List[Dict]]:
+    """One random connected, non-overlapping arrangement, or None if a piece didn't fit"""
+    order = PIECES[:]
+    rng.shuffle(order)
+    color, piece_type = order[0]
+    angle = rng.choice(ANGLES)
+    polygon = piece_polygon(piece_type, (0.0, 0.0), angle)
+    pieces = [{'color': color, 'center': [0.0, 0.0], 'angle': angle, 'piece_type': piece_type}]
+    placed = [(polygon, _bounds(polygon))]
+
+    for color, piece_type in order[1:]:
+        for _ in range(SNAP_ATTEMPTS):
+            target_polygon = rng.choice(placed)[0]
+            i = rng.randrange(len(target_polygon))
+            target = (target_polygon[i], target_polygon[(i + 1) % len(target_polygon)])
+            edge = rng.randrange(len(OUTLINES[piece_type]))
+            center, angle = _snap(piece_type, edge, target, rng.choice(SNAP_MODES))
+            polygon = piece_polygon(piece_type, center, angle)
+            if not _overlaps(polygon, placed):
+                break
+        else:
+            return None
+        placed.append((polygon, _bounds(polygon)))
+        pieces.append({'color': color, 'center': center.tolist(), 'angle': angle, 'piece_type': piece_type})
+
+    # Center the shape where hand-made shapes sit. Rounding the centers to
+    # 0.1 px leaves slivers of a few square pixels along shared edges.
+    vertices = np.concatenate([polygon for polygon, _ in placed])
+    shift = np.array(SHAPE_CENTER) - (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    for piece in pieces:
+        piece['center'] = [round(float(c + s), 1) for c, s in zip(piece['center'], shift)]
+    return pieces
+
+
+def _polygons(pieces) -> List[np.ndarray]:
+    return [piece_polygon(p['piece_type'], p['center'], p['angle']) for p in pieces]
+
+
+def canonical_hash(pieces) -> str:
+    """
+    Hash that is the same for an arrangement moved or turned in 45 degree
+    steps. Pieces are compared by their vertices, so poses that draw the
+    same polygon (a square turned 90 degrees) count as equal.
+    """
+    polygons = _polygons(pieces)
+    best = None
+    for angle in ANGLES:
+        rotation = rotation_matrices([angle])[0]
+        turned = [polygon @ rotation for polygon in polygons]
+        origin = np.concatenate(turned).min(axis=0)
+        key = tuple(sorted(
+            (piece['piece_type'],
+             tuple(sorted((round(x, 1) + 0.0, round(y, 1) + 0.0) for x, y in (polygon - origin).tolist())))
+            for piece, polygon in zip(pieces, turned)
+        ))
+        if best is None or key < best:
+            best = key
+    return hashlib.sha1(repr(best).encode('utf-8')).hexdigest()[:16]
+
+
+def _shared_length(a, b) -> float:
+    """Length of edge shared between two polygons"""
+    total = 0.0
+    for i in range(len(a)):
+        p, q = a[i], a[(i + 1) % len(a)]
+        direction = q - p
+        length = math.hypot(*direction)
+        unit = direction / length
+        normal = np.array([-unit[1], unit[0]])
+        for j in range(len(b)):
+            r, s = b[j], b[(j + 1) % len(b)]
+            if abs((r - p) @ normal) > CONTACT_DISTANCE or abs((s - p) @ normal) > CONTACT_DISTANCE:
+                continue
+            t0, t1 = sorted(((r - p) @ unit, (s - p) @ unit))
+            total += max(0.0, min(t1, length) - max(t0, 0.0))
+    return total
+
+
+def rate_difficulty(pieces) -> Tuple[float, str]:
+    """
+    Difficulty score (0-1) and label. Puzzles get harder as the outline
+    gives less away: a compact, convex silhouette (solidity), more of the
+    pieces' edges hidden inside it (contact) and more pieces turned to
+    diagonals.
+    """
+    polygons = _polygons(pieces)
+    area = sum(abs(polygon_area(polygon.tolist())) for polygon in polygons)
+    hull = cv2.convexHull(np.concatenate(polygons).astype(np.float32))
+    solidity = area / max(cv2.contourArea(hull), 1e-9)
+    perimeter = sum(np.hypot(*(polygon - np.roll(polygon, -1, axis=0)).T).sum() for polygon in polygons)
+    shared = sum(_shared_length(polygons[i], polygons[j])
+                 for i in range(len(polygons)) for j in range(i + 1, len(polygons)))
+    contact = min(1.0, 2 * shared / perimeter / 0.5)  # Half the edge length hidden counts as fully hidden
+    diagonal = sum(1 for p in pieces if p['angle'] % 90) / len(pieces)
+    score = 0.5 * solidity + 0.3 * contact + 0.2 * diagonal
+    if score < EASY_BELOW:
+        return score, 'easy'
+    return score, 'medium' if score < HARD_FROM else 'hard'
+
+
+def generate_batch(seed, attempts=BATCH_SIZE):
+    """
+    Pool task: try `attempts` arrangements from one seed.
+    Returns (attempts, [(hash, pieces, difficulty), ...] for those that worked)
+    """
+    rng = random.Random(seed)
+    results = []
+    for _ in range(attempts):
+        pieces = random_arrangement(rng)
+        if pieces is not None:
+            results.append((canonical_hash(pieces), pieces, rate_difficulty(pieces)[1]))
+    return attempts, results
+
+
+def generate(count, workers=None, seed=None, known=()) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Generate `count` new shapes across a process pool. known: canonical
+    hashes to treat as duplicates. Returns ({key: shape}, throughput stats).
+    Batches are taken in seed order, so a seed gives the same shapes with
+    any number of workers. Stops short (stats['stalled']) once STALL_BATCHES
+    batches in a row found nothing new.
+    """
+    workers = workers or os.cpu_count() or 1
+    seed = seed if seed is not None else random.randrange(2 ** 32)
+    seen = set(known)
+    shapes = {}
+    stats = {'attempts': 0, 'valid': 0, 'duplicates': 0, 'workers': workers, 'stalled': False}
+    start = time.perf_counter()
+    next_seed = seed
+    stalled = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while len(shapes) < count:
+            if stalled >= STALL_BATCHES:
+                stats['stalled'] = True
+                break
+            # Keep two batches per worker queued
+            while len(pending) < 2 * workers:
+                pending.append(pool.submit(generate_batch, next_seed))
+                next_seed += 1
+            attempts, results = pending.popleft().result()
+            stats['attempts'] += attempts
+            added = len(shapes)
+            for digest, pieces, difficulty in results:
+                stats['valid'] += 1
+                if digest in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(digest)
+                if len(shapes) < count:
+                    key = f"gen_{digest}"
+                    shapes[key] = validate_shape(key, {
+                        'name': f"Puzzle {digest[:6].upper()}",
+                        'difficulty': difficulty,
+                        'pieces': pieces
+                    })
+            stalled = 0 if len(shapes) > added else stalled + 1
+        for future in pending:
+            future.cancel()
+    stats['seconds'] = time.perf_counter() - start
+    return shapes, stats
+
+
+def throughput_report(stats, shapes) -> str:
+    """Lines summarizing a generate() run"""
+    minutes = max(stats['seconds'], 1e-9) / 60
+    difficulties = {}
+    for shape in shapes.values():
+        difficulties[shape['difficulty']] = difficulties.get(shape['difficulty'], 0) + 1
+    return "\n".join([
+        f"{stats['attempts']} arrangements tried in {stats['seconds']:.1f} s on {stats['workers']} workers "
+        f"({stats['attempts'] / minutes:,.0f} per minute)",
+        f"  {stats['valid']} connected and overlap-free ({stats['valid'] / minutes:,.0f} per minute), "
+        f"{stats['duplicates']} duplicates",
+        f"  {len(shapes)} new shapes: " + ", ".join(
+            f"{difficulties.get(level, 0)} {level}" for level in ('easy', 'medium', 'hard')),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate random puzzles for the shape library")
+    parser.add_argument('count', nargs='?', type=int, default=100, help="new shapes to add (default 100)")
+    parser.add_argument('--workers', type=int, default=None, help="generator processes (default: CPUs)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed, for repeatable runs")
+    parser.add_argument('--dry-run', action='store_true', help="report only, don't save the shapes")
+    args = parser.parse_args()
+
+    store = None if args.dry_run else open_shape_store()
+    # Shapes already in the library count as duplicates
+    known = set()
+    if store is not None:
+        known = {canonical_hash(shape['pieces']) for shape in store.get_all().values()}
+
+    shapes, stats = generate(args.count, args.workers, args.seed, known)
+    print(throughput_report(stats, shapes))
+    if stats['stalled']:
+        print(f"Warning: Only {len(shapes)} of {args.count} new shapes found; the last "
+              f"{STALL_BATCHES * BATCH_SIZE} arrangements were all duplicates or invalid")
+    if store is not None:
+        store.import_shapes(shapes)
+        print(f"✓ Saved {len(shapes)} shapes to {store.path} ({len(store)} shapes in the library)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
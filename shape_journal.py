@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Journal - crash-safe saves for the JSON shape library
+Saving a shape appends one line to shapes.json.journal instead of
+rewriting shapes.json. Loading replays the journal over the last
+snapshot (shapes.json). Compaction folds the journal into a new
+snapshot on a background thread and swaps it in with an atomic rename.
+
+Journal lines are JSON records:
+  {"op": "upsert", "key": "swan", "shape": {...}}
+  {"op": "delete", "key": "swan"}
+Shapes are validated (shape_schema) when saved and again when replayed.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from shape_schema import validate_shape, ShapeFormatError
+
+
+def _fsync_directory(path):
+    """Make a rename in path's directory durable (POSIX only)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ShapeJournal:
+    """
+    Append-only log of shape changes on top of a JSON snapshot.
+    Every save is one appended, fsynced line. A line cut short by a crash
+    is dropped on the next open, so the library is never left unreadable.
+    """
+
+    # Fold the journal into the snapshot once it holds this many records
+    COMPACT_AFTER = 200
+
+    def __init__(self, snapshot_path='shapes.json', compact_after=COMPACT_AFTER):
+        self.snapshot_path = snapshot_path
+        self.journal_path = f"{snapshot_path}.journal"
+        # The journal being compacted; appends go to a fresh journal meanwhile
+        self.compacting_path = f"{snapshot_path}.journal.compacting"
+        self.compact_after = compact_after
+        self.records = 0
+        self._lock = threading.Lock()  # Journal appends and rotation
+        self._snapshot_lock = threading.Lock()  # Snapshot rewrites
+        self._compactor = None
+
+    def load(self, snapshot: Optional[Dict[str, Dict]] = None, repair=True) -> Optional[Dict[str, Dict]]:
+        """
+        Snapshot with the journal replayed over it (None if neither exists).
+        Pass snapshot when the caller has already read the snapshot file;
+        it is updated in place. With repair=False an incomplete last record
+        is skipped but left in the file, as it may still be being written
+        (reloads while another program saves).
+        """
+        shapes = snapshot if snapshot is not None else self._read_snapshot()
+        found = shapes is not None
+        if shapes is None:
+            shapes = {}
+        replayed = self._replay(self.compacting_path, shapes, repair)
+        self.records = self._replay(self.journal_path, shapes, repair)
+        return shapes if found or replayed or self.records else None
+
+    def _read_snapshot(self) -> Optional[Dict[str, Dict]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _replay(self, path, shapes, repair=True) -> int:
+        """Apply a journal file's records to shapes; returns how many there were"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().split('\n')
+        except FileNotFoundError:
+            return 0
+        records = [(number, line) for number, line in enumerate(lines[:-1], 1) if line]
+        if lines[-1] and repair:  # The last piece has no newline: torn or empty
+            self._truncate_torn_tail(path, len(lines[-1].encode('utf-8')))
+        for number, line in records:
+            try:
+                record = json.loads(line)
+                op, key = record['op'], record['key']
+                if op == 'upsert':
+                    shapes[key] = validate_shape(key, record['shape'])
+                elif op == 'delete':
+                    shapes.pop(key, None)
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+            except ShapeFormatError as e:
+                print(f"Warning: skipping shape in {path}: {e}")
+            except (ValueError, KeyError, TypeError) as e:
+                # Damaged mid-file (a lost write, a hand edit): the other records still apply
+                print(f"Warning: skipping unreadable record on line {number} of {path}: {e!r}")
+        return len(records)
+
+    def _truncate_torn_tail(self, path, length):
+        """Drop a partial last record left by a crash mid-append"""
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - length)
+        print(f"Warning: dropped an incomplete record at the end of {path}")
+
+    def upsert(self, key, shape: Dict):
+        """Save one shape; raises ShapeFormatError for an invalid one"""
+        self._append({'op': 'upsert', 'key': key, 'shape': validate_shape(key, shape)})
+
+    def delete(self, key):
+        """Remove one shape"""
+        self._append({'op': 'delete', 'key': key})
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.records += 1
+        if self.records >= self.compact_after:
+            self.compact()
+
+    def write_snapshot(self, shapes: Dict[str, Dict]):
+        """Replace the whole library: new snapshot, empty journal"""
+        with self._lock, self._snapshot_lock:
+            self._write_snapshot(shapes)
+            # Records still in the journals are already part of shapes
+            for path in (self.journal_path, self.compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.records = 0
+
+    def _write_snapshot(self, shapes):
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(shapes, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        _fsync_directory(self.snapshot_path)
+
+    def compact(self, background=True):
+        """
+        Fold the journal into a new snapshot. The journal is first renamed
+        aside so saves can continue meanwhile; a crash at any point leaves
+        files that load() replays to the same library.
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return self._compactor
+            if not os.path.exists(self.compacting_path):
+                if not os.path.exists(self.journal_path):
+                    return None
+                os.replace(self.journal_path, self.compacting_path)
+                self.records = 0
+            # else: finish a compaction interrupted by a crash first
+        if not background:
+            self._fold()
+            return None
+        self._compactor = threading.Thread(target=self._fold, name="ShapeJournalCompactor", daemon=True)
+        self._compactor.start()
+        return self._compactor
+
+    def _fold(self):
+        with self._snapshot_lock:
+            if not os.path.exists(self.compacting_path):
+                return  # Superseded by write_snapshot()
+            shapes = self._read_snapshot() or {}
+            self._replay(self.compacting_path, shapes)
+            self._write_snapshot(shapes)
+            os.remove(self.compacting_path)
+
+    def wait(self):
+        """Block until a running compaction has finished"""
+        if self._compactor is not None:
+            self._compactor.join()
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Pack - the shape library compiled into one binary file
+A fixed-layout file that is memory-mapped and read in place: a header,
+a shape index sorted by key (binary-searched, nothing is parsed up front)
+and one flat table of pieces. The header records a fingerprint of the
+source files; a pack that no longer matches them is rebuilt automatically.
+
+Layout (little-endian):
+  header   magic, version, shape count, piece count, source fingerprint
+  shapes   SHAPE_DTYPE records sorted by key
+  order    uint32 per shape: index of the n-th shape in library order
+  pieces   PIECE_DTYPE records, each shape's pieces contiguous
+
+Usage: python shape_pack.py [shapes.pack]   (compile shapes_config.py / shapes.json)
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Sequence
+
+import numpy as np
+
+from shape_schema import COLORS, PIECE_TYPES
+
+DEFAULT_PACK = 'shapes.pack'
+MAGIC = b'TGPACK\x00\x00'
+VERSION = 2  # 2: editor dumps converted with the editor's piece colors
+HEADER = struct.Struct('<8sIII32s')
+
+# Colors and piece types are stored as indexes into the schema's tables
+SHAPE_DTYPE = np.dtype([
+    ('key', 'S64'),
+    ('name', 'S64'),
+    ('difficulty', 'S16'),
+    ('first', '<u4'),
+    ('count', '<u4'),
+])
+PIECE_DTYPE = np.dtype([
+    ('color', 'u1'),
+    ('piece_type', 'u1'),
+    ('x', '<f8'),
+    ('y', '<f8'),
+    ('angle', '<f8'),
+])
+
+
+def source_fingerprint(sources: Sequence[str]) -> bytes:
+    """Digest of the source files' paths, sizes and modification times"""
+    digest = hashlib.sha256()
+    for path in sources:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            digest.update(f"{os.path.abspath(path)}:missing;".encode())
+    return digest.digest()
+
+
+def _encode(text, field) -> bytes:
+    data = str(text).encode('utf-8')
+    if len(data) > SHAPE_DTYPE[field].itemsize:
+        raise ValueError(f"Shape {field} too long for the pack: {text!r}")
+    return data
+
+
+def compile_pack(shapes: Dict[str, Dict], path=DEFAULT_PACK, fingerprint: bytes = b''):
+    """Write shapes to a pack file (atomically: temp file, then rename)"""
+    keys = list(shapes)
+    sorted_keys = sorted(keys, key=lambda k: _encode(k, 'key'))
+    records = np.zeros(len(keys), dtype=SHAPE_DTYPE)
+    piece_count = sum(len(shapes[key]['pieces']) for key in keys)
+    pieces = np.zeros(piece_count, dtype=PIECE_DTYPE)
+
+    first = 0
+    for i, key in enumerate(sorted_keys):
+        shape = shapes[key]
+        count = len(shape['pieces'])
+        records[i] = (_encode(key, 'key'), _encode(shape.get('name', key), 'name'),
+                      _encode(shape.get('difficulty', 'medium'), 'difficulty'), first, count)
+        for j, piece in enumerate(shape['pieces']):
+            pieces[first + j] = (COLORS.index(piece['color']),
+                                 PIECE_TYPES.index(piece.get('piece_type', 'square')),
+                                 piece['center'][0], piece['center'][1], piece.get('angle', 0))
+        first += count
+    row_of = {key: i for i, key in enumerate(sorted_keys)}
+    order = np.array([row_of[key] for key in keys], dtype='<u4')
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), piece_count, fingerprint.ljust(32, b'\0')))
+        f.write(records.tobytes())
+        f.write(order.tobytes())
+        f.write(pieces.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class ShapePack:
+    """A memory-mapped pack file; shapes are sliced out on demand"""
+
+    def __init__(self, path=DEFAULT_PACK):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, shape_count, piece_count, fingerprint = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} shape pack")
+        self.fingerprint = fingerprint
+        offset = HEADER.size
+        self.records = np.frombuffer(self._map, SHAPE_DTYPE, shape_count, offset)
+        offset += shape_count * SHAPE_DTYPE.itemsize
+        self.order = np.frombuffer(self._map, '<u4', shape_count, offset)
+        offset += shape_count * 4
+        self.pieces = np.frombuffer(self._map, PIECE_DTYPE, piece_count, offset)
+
+    def __len__(self):
+        return len(self.records)
+
+    def keys(self):
+        """Shape keys in library order"""
+        return [self.records['key'][i].decode('utf-8') for i in self.order]
+
+    def find(self, key) -> int:
+        """Row of a shape key (binary search), or -1"""
+        encoded = key.encode('utf-8')
+        row = int(np.searchsorted(self.records['key'], encoded))
+        if row < len(self.records) and self.records['key'][row] == encoded:
+            return row
+        return -1
+
+    def shape(self, row) -> Dict:
+        """Decode one shape in shapes_config format"""
+        record = self.records[row]
+        first, count = int(record['first']), int(record['count'])
+        return {
+            'name': record['name'].decode('utf-8'),
+            'difficulty': record['difficulty'].decode('utf-8'),
+            'pieces': [
+                {'color': COLORS[p['color']], 'center': [float(p['x']), float(p['y'])],
+                 'angle': float(p['angle']), 'piece_type': PIECE_TYPES[p['piece_type']]}
+                for p in self.pieces[first:first + count]
+            ]
+        }
+
+    def close(self):
+        # Drop the array views first; the map can't close while they exist
+        self.records = self.order = self.pieces = None
+        self._map.close()
+
+
+class PackedShapes(MutableMapping):
+    """
+    A pack as the {key: shape} mapping for ShapeLibrary.shapes. Lookups
+    binary-search the pack and decode a shape on first access, which is
+    then kept; assigned shapes are held in memory on top of the pack
+    (save them to a source file to keep them).
+    """
+
+    def __init__(self, pack: ShapePack):
+        self.pack = pack
+        self._loaded = {}
+        self._added = {}  # Ordered set of keys not in the pack
+        self._deleted = set()  # Pack keys removed from the mapping
+
+    def __getitem__(self, key):
+        shape = self._loaded.get(key)
+        if shape is None:
+            row = self.pack.find(key) if key not in self._deleted else -1
+            if row < 0:
+                raise KeyError(key)
+            shape = self._loaded[key] = self.pack.shape(row)
+        return shape
+
+    def __setitem__(self, key, shape):
+        if self.pack.find(key) < 0:
+            self._added.setdefault(key)
+        self._deleted.discard(key)
+        self._loaded[key] = shape
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._added:
+            del self._added[key]
+        else:
+            self._deleted.add(key)
+        self._loaded.pop(key, None)
+
+    def __iter__(self):
+        keys = [key for key in self.pack.keys() if key not in self._deleted]
+        return iter(keys + list(self._added))
+
+    def __len__(self):
+        return len(self.pack) - len(self._deleted) + len(self._added)
+
+    def __contains__(self, key):
+        return key in self._added or (key not in self._deleted and self.pack.find(key) >= 0)
+
+
+def load_pack(path, sources: Sequence[str], build: Callable[[], Dict[str, Dict]]) -> PackedShapes:
+    """
+    Open the pack at path if it was compiled from the current sources;
+    otherwise call build() for the shapes, recompile the pack and open that
+    """
+    fingerprint = source_fingerprint(sources)
+    if os.path.exists(path):
+        try:
+            pack = ShapePack(path)
+            if pack.fingerprint == fingerprint:
+                return PackedShapes(pack)
+            pack.close()
+        except ValueError:
+            pass  # Old or damaged pack: rebuild it
+    compile_pack(build(), path, fingerprint)
+    return PackedShapes(ShapePack(path))
+
+
+def main():
+    import sys
+    from tangram_game import ShapeLibrary
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PACK
+    library = ShapeLibrary(pack_file=path)
+    print(f"{path}: {len(library.shapes)} shapes, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
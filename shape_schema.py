@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Schema - one canonical shape format and adapters for every file format
+Canonical shapes are what shapes_config.SHAPES already holds:
+  {key: {'name': str, 'difficulty': str,
+         'pieces': [{'color', 'center': [x, y], 'angle', 'piece_type'}, ...]}}
+
+Adapters convert and validate:
+  shapes_config.py              SHAPES dict (library format)
+  shapes.json                   the same keys, as JSON (library format)
+  shape_<name>_<time>.json      editor dumps: scale, offset and pieces keyed
+                                large_tri_1 etc. with x / y / rotation
+Converted files are cached by content hash, so loading an unchanged file
+again costs one read and one hash.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from typing import Dict, List
+
+COLORS = ('red', 'blue', 'yellow', 'green', 'orange', 'purple', 'teal')
+PIECE_TYPES = ('large_triangle', 'medium_triangle', 'small_triangle', 'square', 'parallelogram')
+PIECE_COUNT = 7
+
+# Editor dump piece names, with the color and type each stands for in the game
+# (the colors shape_editor_enhanced gives its pieces)
+EDITOR_PIECES = {
+    'large_tri_1': ('red', 'large_triangle'),
+    'large_tri_2': ('blue', 'large_triangle'),
+    'medium_tri': ('green', 'medium_triangle'),
+    'small_tri_1': ('yellow', 'small_triangle'),
+    'small_tri_2': ('purple', 'small_triangle'),
+    'square': ('teal', 'square'),
+    'parallelogram': ('orange', 'parallelogram'),
+}
+
+EDITOR_DUMP_NAME = re.compile(r'^shape_(?P<key>.+?)(?:_\d{8}_\d{6})?\.json$')
+
+
+class ShapeFormatError(ValueError):
+    """A shape or shape file that doesn't fit the schema"""
+
+
+def validate_shape(key, shape) -> Dict:
+    """Check one canonical shape; returns it with centers as [x, y] lists"""
+    if not isinstance(shape, dict):
+        raise ShapeFormatError(f"{key}: shape must be a dict, got {type(shape).__name__}")
+    pieces = shape.get('pieces')
+    if not isinstance(pieces, list) or not pieces:
+        raise ShapeFormatError(f"{key}: shape has no pieces")
+    if len(pieces) != PIECE_COUNT:
+        raise ShapeFormatError(f"{key}: {len(pieces)} pieces, a tangram has {PIECE_COUNT}")
+
+    seen = set()
+    checked = []
+    for i, piece in enumerate(pieces):
+        where = f"{key}: piece {i + 1}"
+        try:
+            color = piece['color']
+            center = piece['center']
+            x, y = center
+        except (KeyError, TypeError, ValueError):
+            raise ShapeFormatError(f"{where} needs a color and a center [x, y]")
+        if color not in COLORS:
+            raise ShapeFormatError(f"{where}: unknown color {color!r}")
+        if color in seen:
+            raise ShapeFormatError(f"{where}: color {color!r} used twice")
+        seen.add(color)
+        piece_type = piece.get('piece_type', '')
+        if piece_type not in PIECE_TYPES:
+            raise ShapeFormatError(f"{where}: unknown piece type {piece_type!r}")
+        angle = piece.get('angle', 0)
+        if not all(isinstance(v, (int, float)) for v in (x, y, angle)):
+            raise ShapeFormatError(f"{where}: center and angle must be numbers")
+        checked.append({'color': color, 'center': [x, y], 'angle': angle, 'piece_type': piece_type})
+
+    return {
+        'name': str(shape.get('name', key)),
+        'difficulty': str(shape.get('difficulty', 'medium')),
+        'pieces': checked
+    }
+
+
+def from_library(data, source='shapes') -> Dict[str, Dict]:
+    """Library format (shapes_config.SHAPES, shapes.json); invalid shapes are skipped"""
+    if not isinstance(data, dict):
+        raise ShapeFormatError(f"{source}: expected a dict of shapes")
+    shapes = {}
+    for key, shape in data.items():
+        try:
+            shapes[key] = validate_shape(key, shape)
+        except ShapeFormatError as e:
+            print(f"Warning: skipping shape in {source}: {e}")
+    return shapes
+
+
+def from_editor_dump(data, key, name=None, difficulty='medium') -> Dict[str, Dict]:
+    """Editor dump (scale, offset, pieces by piece name) as a one-shape library"""
+    try:
+        scale = float(data.get('scale', 1.0))
+        offset_x, offset_y = data.get('offset', (0, 0))
+        poses = list(data['pieces'].items())
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ShapeFormatError(f"{key}: not an editor dump ({e})")
+    pieces = []
+    for piece_name, pose in poses:
+        if piece_name not in EDITOR_PIECES:
+            raise ShapeFormatError(f"{key}: unknown editor piece {piece_name!r}")
+        color, piece_type = EDITOR_PIECES[piece_name]
+        try:
+            center = [offset_x + pose['x'] * scale, offset_y + pose['y'] * scale]
+        except (KeyError, TypeError) as e:
+            raise ShapeFormatError(f"{key}: {piece_name} needs numeric x and y ({e})")
+        pieces.append({'color': color, 'center': center, 'angle': pose.get('rotation', 0),
+                       'piece_type': piece_type})
+    shape = {'name': name or key.replace('_', ' ').title(), 'difficulty': difficulty, 'pieces': pieces}
+    return {key: validate_shape(key, shape)}
+
+
+def is_editor_dump(data) -> bool:
+    """Editor dumps key their pieces by piece name instead of listing them"""
+    return isinstance(data, dict) and isinstance(data.get('pieces'), dict)
+
+
+def editor_dump_key(path) -> str:
+    """Shape key from an editor dump file name: shape_swan_20251115_224357.json -> swan"""
+    filename = os.path.basename(path)
+    match = EDITOR_DUMP_NAME.match(filename)
+    return match.group('key') if match else os.path.splitext(filename)[0]
+
+
+def _read_config_module(path) -> Dict:
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SHAPES
+
+
+def convert(path, content: bytes) -> Dict[str, Dict]:
+    """Canonical shapes from a file's content, picking the adapter by format"""
+    if path.endswith('.py'):
+        return from_library(_read_config_module(path), path)
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ShapeFormatError(f"{path}: not valid JSON ({e})")
+    if is_editor_dump(data):
+        return from_editor_dump(data, editor_dump_key(path))
+    return from_library(data, path)
+
+
+_cache: Dict[str, Dict[str, Dict]] = {}
+
+
+def load_shape_file(path) -> Dict[str, Dict]:
+    """
+    Canonical shapes from any supported file, cached by content hash.
+    The shape dicts are shared between calls; replace shapes rather than
+    editing them in place.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    # Editor dumps take their key from the file name, so the path is part of the key
+    digest = hashlib.sha256(os.path.abspath(path).encode('utf-8') + b'\0' + content).hexdigest()
+    shapes = _cache.get(digest)
+    if shapes is None:
+        shapes = _cache[digest] = convert(path, content)
+    return dict(shapes)
+
+
+def find_editor_dumps(directory='.') -> List[str]:
+    """Editor dump files (shape_*.json) in a directory, oldest first"""
+    try:
+        names = sorted(n for n in os.listdir(directory) if EDITOR_DUMP_NAME.match(n))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, n) for n in names]
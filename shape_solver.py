@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Solver - places the seven pieces to fill a silhouette
+Takes a target silhouette (polygons or a bitmask) and searches for a
+placement of the game's seven pieces that covers it, so new shapes don't
+have to be built by hand in the editor.
+
+The silhouette is scaled to the pieces' total area and rasterized onto a
+coarse grid held as Python-int bitsets (one bit per cell). The search
+backtracks over piece positions on that grid and 45 degree rotations:
+every step covers the first uncovered cell (or gives it up, within the
+tolerance), tries only the best-fitting candidates and prunes branches
+that can't beat the best placement found so far. The branches below the
+first step are shared out across a process pool.
+
+The game's pieces (PIECE_SIZES) don't tile exactly, so a solution is the
+placement covering the most of the silhouette with the least overhang,
+with pieces allowed to overlap a little.
+
+Usage: python shape_solver.py [SHAPE ...] [--polygon FILE] [--mask IMAGE]
+                              [--cell PX] [--tolerance F] [--workers N] [--time-limit S]
+  SHAPE        re-solve the silhouette of a library shape
+  --polygon    JSON list of polygons ([[x, y], ...] each) to solve
+  --mask       image whose non-black pixels are the silhouette
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from shape_schema import EDITOR_PIECES, validate_shape
+from tangram_geometry import piece_outline, piece_polygons, polygon_area, shape_polygons
+
+# The seven pieces as (color, piece type), largest first: the search places big pieces early
+PIECES = sorted(EDITOR_PIECES.values(), key=lambda p: -abs(polygon_area(piece_outline(p[1]))))
+PIECE_TYPES = list(dict.fromkeys(piece_type for _, piece_type in PIECES))
+PIECE_COUNTS = tuple(sum(1 for _, t in PIECES if t == piece_type) for piece_type in PIECE_TYPES)
+TOTAL_AREA = sum(abs(polygon_area(piece_outline(piece_type))) for _, piece_type in PIECES)
+
+ANGLES = tuple(range(0, 360, 45))
+SUPERSAMPLE = 4  # Samples per cell side when rasterizing
+PADDING = 2  # Cells around the silhouette that pieces may overhang into
+
+
+def coverage_grid(polygons, origin, cell, rows, cols) -> np.ndarray:
+    """Cells (rows x cols, bool) at least half covered by the polygons"""
+    step = cell / SUPERSAMPLE
+    samples = np.zeros((rows * SUPERSAMPLE, cols * SUPERSAMPLE), dtype=np.uint8)
+    for polygon in polygons:
+        # Sample k's center is at (k + 0.5) * step; fillPoly puts pixel centers on integers
+        points = (np.asarray(polygon, dtype=np.float64).reshape(-1, 2) - origin) / step - 0.5
+        cv2.fillPoly(samples, [np.round(points * 16).astype(np.int32)], 1, shift=4)
+    return samples.reshape(rows, SUPERSAMPLE, cols, SUPERSAMPLE).mean(axis=(1, 3)) >= 0.5
+
+
+def to_bits(grid: np.ndarray) -> int:
+    """Row-major bitset of a bool grid (bit r * cols + c)"""
+    return int.from_bytes(np.packbits(grid.ravel(), bitorder='little').tobytes(), 'little')
+
+
+@dataclass
+class Silhouette:
+    """A target rasterized for the solver; cell (r, c) starts at origin + (c, r) * cell"""
+    grid: np.ndarray
+    origin: Tuple[float, float]
+    cell: float
+
+
+def silhouette_from_polygons(polygons: Sequence, cell=5.0) -> Silhouette:
+    """Rasterize polygons, scaled about their center to the pieces' total area"""
+    polygons = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons]
+    fine = min(cell / SUPERSAMPLE, 1.0)
+    low = np.min([p.min(axis=0) for p in polygons], axis=0)
+    high = np.max([p.max(axis=0) for p in polygons], axis=0)
+    size = np.ceil((high - low) / fine).astype(int) + 1
+    # Measure the area by rasterizing (overlapping polygons count once)
+    area = coverage_grid(polygons, low, fine * SUPERSAMPLE, size[1], size[0]).sum() * (fine * SUPERSAMPLE) ** 2
+    scale = math.sqrt(TOTAL_AREA / max(area, 1e-9))
+    center = (low + high) / 2
+    polygons = [(p - center) * scale + center for p in polygons]
+    low = (low - center) * scale + center - PADDING * cell
+    high = (high - center) * scale + center + PADDING * cell
+    cols, rows = np.ceil((high - low) / cell).astype(int)
+    return Silhouette(coverage_grid(polygons, low, cell, rows, cols), (float(low[0]), float(low[1])), cell)
+
+
+def silhouette_from_mask(mask: np.ndarray, cell=5.0) -> Silhouette:
+    """Rasterize a bitmask (nonzero pixels are the silhouette), scaled to the pieces' total area"""
+    mask = (np.asarray(mask) > 0).astype(np.float32)
+    ys, xs = np.nonzero(mask)
+    if len(xs) == 0:
+        raise ValueError("The mask is empty")
+    mask = mask[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    scale = math.sqrt(TOTAL_AREA / mask.sum())
+    cols = int(math.ceil(mask.shape[1] * scale / cell))
+    rows = int(math.ceil(mask.shape[0] * scale / cell))
+    samples = cv2.resize(mask, (cols * SUPERSAMPLE, rows * SUPERSAMPLE), interpolation=cv2.INTER_AREA)
+    grid = samples.reshape(rows, SUPERSAMPLE, cols, SUPERSAMPLE).mean(axis=(1, 3)) >= 0.5
+    grid = np.pad(grid, PADDING)
+    return Silhouette(grid, (-PADDING * cell, -PADDING * cell), cell)
+
+
+@dataclass
+class Solution:
+    """Placed pieces (shapes_config format) and how well they fit"""
+    pieces: List[Dict]
+    coverage: float  # Fraction of the silhouette's cells covered
+    overhang: float  # Piece cells outside the silhouette, as a fraction of its cells
+    seconds: float
+    nodes: int  # Search steps, over all workers
+    complete: bool  # False when the time limit cut the search short
+
+    def entry(self, key, name=None, difficulty='medium') -> Dict:
+        """A shapes_config / shapes.json entry"""
+        name = name or key.replace('_', ' ').title()
+        return validate_shape(key, {'name': name, 'difficulty': difficulty, 'pieces': self.pieces})
+
+
+def format_entry(key, entry: Dict) -> str:
+    """An entry as text to paste into the SHAPES dict of shapes_config.py"""
+    lines = [f'    "{key}": {{',
+             f'        "name": {json.dumps(entry["name"])},',
+             f'        "difficulty": {json.dumps(entry["difficulty"])},',
+             '        "pieces": [']
+    for i, piece in enumerate(entry['pieces']):
+        lines += ['            {',
+                  f'                "color": "{piece["color"]}",',
+                  f'                "center": {json.dumps(piece["center"])},',
+                  f'                "angle": {piece["angle"]},',
+                  f'                "piece_type": "{piece["piece_type"]}"',
+                  '            }' + (',' if i < len(entry['pieces']) - 1 else '')]
+    lines += ['        ]', '    },']
+    return '\n'.join(lines)
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class _Search:
+    """Backtracking over one silhouette; built once per worker process"""
+
+    def __init__(self, grid: np.ndarray, cell, max_outside, max_overlap, max_uncovered, beam,
+                 deadline, shared_best=None, best_lock=None):
+        self.rows, self.cols = grid.shape
+        self.cell = cell
+        self.target = to_bits(grid)
+        self.target_cells = int(grid.sum())
+        # Cells on the silhouette's edge, where rasterizing leaves ragged cells
+        # that are often better left uncovered
+        interior = cv2.erode(grid.astype(np.uint8), np.ones((3, 3), np.uint8), borderValue=0) > 0
+        self.edge = to_bits(grid & ~interior)
+        self.max_skips = int(max_uncovered * self.target_cells)
+        self.beam = beam
+        self.deadline = deadline
+        self.shared_best = shared_best
+        self.best_lock = best_lock
+        self.best_score = (1 - max_uncovered) * self.target_cells  # Worse isn't a solution
+        self.best = None
+        self.nodes = 0
+
+        outside = ((1 << (self.rows * self.cols)) - 1) & ~self.target
+        # Per piece type: orientations as (angle, cell offsets from the center vertex)
+        self.orientations = [self._orientations(piece_type) for piece_type in PIECE_TYPES]
+        self.areas = [max(len(cells) for _, cells in orients) for orients in self.orientations]
+        # (type, orientation, row, col) -> (bits, area, cells outside the silhouette),
+        # and per type, the placements covering each cell (so a step only
+        # looks at placements that can cover its anchor cell)
+        self.placements = {}
+        self.covering = [{} for _ in PIECE_TYPES]
+        for t, orients in enumerate(self.orientations):
+            for o, (angle, cells) in enumerate(orients):
+                r0 = min(dr for dr, _ in cells)
+                c0 = min(dc for _, dc in cells)
+                r1 = max(dr for dr, _ in cells)
+                c1 = max(dc for _, dc in cells)
+                base = 0
+                for dr, dc in cells:
+                    base |= 1 << ((dr - r0) * self.cols + (dc - c0))
+                for row in range(-r0, self.rows - r1):
+                    for col in range(-c0, self.cols - c1):
+                        bits = base << ((row + r0) * self.cols + col + c0)
+                        overhang = (bits & outside).bit_count()
+                        if overhang <= max_outside * len(cells):
+                            self.placements[t, o, row, col] = (bits, len(cells), overhang)
+                            candidate = (bits, int(max_overlap * len(cells)), overhang, o, row, col)
+                            for dr, dc in cells:
+                                self.covering[t].setdefault((row + dr) * self.cols + col + dc, []).append(candidate)
+
+    def _orientations(self, piece_type):
+        """Distinct rasterized orientations of a piece at the ANGLES"""
+        seen = set()
+        orientations = []
+        for angle in ANGLES:
+            polygon = piece_polygons([piece_type], [(0.0, 0.0)], [angle])[0]
+            r0, c0 = np.floor(polygon.min(axis=0)[::-1] / self.cell).astype(int) - 1
+            r1, c1 = np.ceil(polygon.max(axis=0)[::-1] / self.cell).astype(int) + 1
+            grid = coverage_grid([polygon], (c0 * self.cell, r0 * self.cell), self.cell, r1 - r0, c1 - c0)
+            cells = tuple((int(r + r0), int(c + c0)) for r, c in np.argwhere(grid))
+            # Orientations that only move the piece by whole cells (the square
+            # and the parallelogram turned 90 or 180 degrees) are the same to the search
+            normalized = tuple((r - cells[0][0], c - min(dc for _, dc in cells)) for r, c in cells) if cells else ()
+            if cells and normalized not in seen:
+                seen.add(normalized)
+                orientations.append((angle, cells))
+        return orientations
+
+    def candidates(self, occupied, free, counts):
+        """Placements of remaining pieces covering the first free cell, best fit first"""
+        anchor = (free & -free).bit_length() - 1
+        found = []
+        for t, count in enumerate(counts):
+            if not count:
+                continue
+            for bits, max_overlap, overhang, o, row, col in self.covering[t].get(anchor, ()):
+                if (bits & occupied).bit_count() > max_overlap:
+                    continue
+                gain = (bits & free).bit_count() - overhang
+                found.append((gain, t, o, row, col, bits, overhang))
+        found.sort(key=lambda c: -c[0])
+        return anchor, found[:self.beam]
+
+    def expand(self, state):
+        """
+        Child states of a search state: each candidate, then leaving the
+        anchor cell uncovered. Inside the silhouette that is only tried when
+        no piece fits over the cell.
+        """
+        occupied, free, counts, score, skips, placed = state
+        anchor, found = self.candidates(occupied, free, counts)
+        children = []
+        for gain, t, o, row, col, bits, overhang in found:
+            remaining = counts[:t] + (counts[t] - 1,) + counts[t + 1:]
+            children.append((occupied | bits, free & ~bits, remaining,
+                             score + (bits & free).bit_count() - overhang, skips, placed + ((t, o, row, col),)))
+        if skips < self.max_skips and (not found or self.edge >> anchor & 1):
+            children.append((occupied, free & ~(1 << anchor), counts, score, skips + 1, placed))
+        return children
+
+    def root(self):
+        return (0, self.target, PIECE_COUNTS, 0, 0, ())
+
+    def run(self, state):
+        """
+        Search below a state. Returns ((score, placements) or None, search
+        steps, whether the time limit stopped it)
+        """
+        try:
+            self._search(state)
+        except _SearchTimeout:
+            return self.best, self.nodes, True
+        return self.best, self.nodes, False
+
+    def _threshold(self):
+        if self.shared_best is not None:
+            return max(self.best_score, self.shared_best.value)
+        return self.best_score
+
+    def _search(self, state):
+        occupied, free, counts, score, skips, placed = state
+        self.nodes += 1
+        if self.nodes % 256 == 0 and time.time() > self.deadline:
+            raise _SearchTimeout()
+
+        if not any(counts):
+            if score > self._threshold():
+                self.best_score = score
+                self.best = (score, placed)
+                if self.shared_best is not None:
+                    with self.best_lock:
+                        if score > self.shared_best.value:
+                            self.shared_best.value = score
+            return
+        if not free:
+            return  # Pieces left over but nothing left to cover
+
+        # Each remaining piece adds at most its area, and no more than is left to cover
+        remaining_area = sum(count * area for count, area in zip(counts, self.areas))
+        if score + min(remaining_area, free.bit_count()) <= self._threshold():
+            return
+
+        for child in self.expand(state):
+            self._search(child)
+
+
+_worker = None
+
+
+def _init_worker(grid, params, shared_best, best_lock):
+    global _worker
+    _worker = _Search(grid, **params, shared_best=shared_best, best_lock=best_lock)
+
+
+def _run_branch(state):
+    return _worker.run(state)
+
+
+class ShapeSolver:
+    """
+    Finds piece placements for silhouettes.
+    cell: grid resolution in pixels at piece scale (smaller is finer and slower)
+    tolerance: fraction of the silhouette that may stay uncovered
+    max_outside: fraction of a piece that may hang outside the silhouette
+    max_overlap: fraction of a piece that may overlap pieces already placed
+    beam: candidates tried per step
+    workers: processes to search with (default: one per CPU; 1 searches in-process)
+    time_limit: seconds before the best placement so far is returned
+    """
+
+    def __init__(self, cell=5.0, tolerance=0.15, max_outside=0.2, max_overlap=0.15, beam=6,
+                 workers=None, time_limit=30.0):
+        self.cell = cell
+        self.tolerance = tolerance
+        self.max_outside = max_outside
+        self.max_overlap = max_overlap
+        self.beam = beam
+        self.workers = workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+
+    def solve_polygons(self, polygons: Sequence) -> Optional[Solution]:
+        return self.solve(silhouette_from_polygons(polygons, self.cell))
+
+    def solve_mask(self, mask: np.ndarray) -> Optional[Solution]:
+        return self.solve(silhouette_from_mask(mask, self.cell))
+
+    def solve(self, silhouette: Silhouette) -> Optional[Solution]:
+        """Best placement for a rasterized silhouette, or None if none fits the tolerances"""
+        start = time.perf_counter()
+        params = dict(cell=silhouette.cell, max_outside=self.max_outside, max_overlap=self.max_overlap,
+                      max_uncovered=self.tolerance, beam=self.beam, deadline=time.time() + self.time_limit)
+        search = _Search(silhouette.grid, **params)
+
+        if self.workers == 1:
+            best, nodes, timed_out = search.run(search.root())
+        else:
+            # Each branch below the first step is searched in a worker; the
+            # best score so far is shared so every worker prunes against it
+            shared_best = multiprocessing.Value('d', search.best_score, lock=False)
+            best_lock = multiprocessing.Lock()
+            branches = search.expand(search.root())
+            best, nodes, timed_out = None, 1, False
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(branches)) or 1,
+                                     initializer=_init_worker,
+                                     initargs=(silhouette.grid, params, shared_best, best_lock)) as pool:
+                for result, branch_nodes, branch_timed_out in pool.map(_run_branch, branches):
+                    nodes += branch_nodes
+                    timed_out = timed_out or branch_timed_out
+                    if result is not None and (best is None or result[0] > best[0]):
+                        best = result
+        seconds = time.perf_counter() - start
+        if best is None:
+            return None
+        return self._solution(search, silhouette, best[1], seconds, nodes, not timed_out)
+
+    def _solution(self, search, silhouette, placed, seconds, nodes, complete) -> Solution:
+        colors = {piece_type: [color for color, t in PIECES if t == piece_type] for piece_type in PIECE_TYPES}
+        occupied = 0
+        overhang = 0
+        pieces = []
+        for t, o, row, col in placed:
+            bits, _, outside = search.placements[t, o, row, col]
+            occupied |= bits
+            overhang += outside
+            piece_type = PIECE_TYPES[t]
+            x = silhouette.origin[0] + col * silhouette.cell
+            y = silhouette.origin[1] + row * silhouette.cell
+            pieces.append({
+                'color': colors[piece_type].pop(0),
+                'center': [round(x, 1), round(y, 1)],
+                'angle': search.orientations[t][o][0],
+                'piece_type': piece_type
+            })
+        cells = max(search.target_cells, 1)
+        return Solution(pieces, (occupied & search.target).bit_count() / cells, overhang / cells,
+                        seconds, nodes, complete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Place the seven pieces to fill a silhouette")
+    parser.add_argument('shapes', nargs='*', metavar='SHAPE', help="library shapes to re-solve")
+    parser.add_argument('--polygon', metavar='FILE', help="JSON list of polygons to solve")
+    parser.add_argument('--mask', metavar='IMAGE', help="image whose non-black pixels are the silhouette")
+    parser.add_argument('--name', default='solved', help="key for --polygon / --mask solutions")
+    parser.add_argument('--cell', type=float, default=5.0, help="grid cell size in pixels (default 5)")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="fraction of the silhouette that may stay uncovered (default 0.15)")
+    parser.add_argument('--workers', type=int, default=None, help="search processes (default: CPUs)")
+    parser.add_argument('--time-limit', type=float, default=30.0, help="seconds per shape (default 30)")
+    args = parser.parse_args()
+
+    solver = ShapeSolver(cell=args.cell, tolerance=args.tolerance, workers=args.workers,
+                         time_limit=args.time_limit)
+    targets = []
+    if args.polygon:
+        with open(args.polygon, 'r', encoding='utf-8') as f:
+            targets.append((args.name, lambda data=json.load(f): solver.solve_polygons(data)))
+    if args.mask:
+        image = cv2.imread(args.mask, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            parser.error(f"Could not read {args.mask}")
+        targets.append((args.name, lambda: solver.solve_mask(image)))
+    if args.shapes or not targets:
+        from shapes_config import SHAPES
+        for key in args.shapes or list(SHAPES):
+            if key not in SHAPES:
+                parser.error(f"Unknown shape {key!r}")
+            targets.append((key, lambda key=key: solver.solve_polygons(shape_polygons(SHAPES[key]['pieces']))))
+
+    for key, solve in targets:
+        solution = solve()
+        if solution is None:
+            print(f"{key}: no placement within the tolerances")
+            continue
+        print(f"{key}: {solution.seconds:.2f} s, {solution.nodes} steps, "
+              f"{solution.coverage:.0%} covered, {solution.overhang:.0%} overhang"
+              f"{'' if solution.complete else ' (time limit reached)'}")
+        print(format_entry(key, solution.entry(key)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Shape Store - SQLite-backed shape library
+One row per shape and one per piece (WAL mode). Shape names and pieces
+are read on first use, and saving a shape is a single small transaction,
+so neither startup nor saves grow with the size of the library.
+shapes_config.py and shapes.json become import formats. Shapes are
+validated (shape_schema) when written and when read back.
+
+Usage:
+  python shape_store.py import [shapes.db] [shapes_config.py | shapes.json | shape_*.json ...]
+  python shape_store.py list [shapes.db] [difficulty]
+"""
+
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+from typing import Dict, List, Optional
+
+from shape_schema import load_shape_file, validate_shape, ShapeFormatError
+
+DEFAULT_DATABASE = 'shapes.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shapes (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    difficulty TEXT NOT NULL DEFAULT 'medium'
+);
+CREATE INDEX IF NOT EXISTS shapes_difficulty ON shapes(difficulty);
+CREATE INDEX IF NOT EXISTS shapes_name ON shapes(name);
+CREATE TABLE IF NOT EXISTS pieces (
+    shape_key TEXT NOT NULL REFERENCES shapes(key) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    color TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    angle REAL NOT NULL,
+    piece_type TEXT NOT NULL,
+    PRIMARY KEY (shape_key, slot)
+) WITHOUT ROWID;
+"""
+
+
+def _piece_dict(row) -> Dict:
+    """Piece row (color, x, y, angle, piece_type) in shapes_config format"""
+    color, x, y, angle, piece_type = row
+    return {'color': color, 'center': [x, y], 'angle': angle, 'piece_type': piece_type}
+
+
+class ShapeStore:
+    """
+    Shape library in an SQLite database. Shapes keep the order they were
+    first added in; updating a shape keeps its place.
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, safe against corruption
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM shapes").fetchone()[0]
+
+    def __contains__(self, key):
+        return self.conn.execute("SELECT 1 FROM shapes WHERE key = ?", (key,)).fetchone() is not None
+
+    def keys(self) -> List[str]:
+        """All shape keys in library order"""
+        return [key for (key,) in self.conn.execute("SELECT key FROM shapes ORDER BY rowid")]
+
+    def find(self, difficulty: str = None, name: str = None) -> List[str]:
+        """Keys of shapes with the given difficulty and/or name (indexed lookups)"""
+        clauses, params = [], []
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [key for (key,) in self.conn.execute(f"SELECT key FROM shapes{where} ORDER BY rowid", params)]
+
+    def get(self, key) -> Optional[Dict]:
+        """One shape with its pieces, or None (also for a shape that fails validation)"""
+        row = self.conn.execute("SELECT name, difficulty FROM shapes WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return self._validated(key, {'name': row[0], 'difficulty': row[1], 'pieces': self.pieces(key)})
+
+    def _validated(self, key, shape) -> Optional[Dict]:
+        try:
+            return validate_shape(key, shape)
+        except ShapeFormatError as e:
+            print(f"Warning: skipping shape in {self.path}: {e}")
+            return None
+
+    def pieces(self, key) -> List[Dict]:
+        """Pieces of one shape in their saved order"""
+        rows = self.conn.execute(
+            "SELECT color, x, y, angle, piece_type FROM pieces WHERE shape_key = ? ORDER BY slot", (key,))
+        return [_piece_dict(row) for row in rows]
+
+    def get_all(self) -> Dict[str, Dict]:
+        """Every valid shape, read in two queries"""
+        shapes = {
+            key: {'name': name, 'difficulty': difficulty, 'pieces': []}
+            for key, name, difficulty in self.conn.execute(
+                "SELECT key, name, difficulty FROM shapes ORDER BY rowid")
+        }
+        for row in self.conn.execute(
+                "SELECT shape_key, color, x, y, angle, piece_type FROM pieces ORDER BY shape_key, slot"):
+            shapes[row[0]]['pieces'].append(_piece_dict(row[1:]))
+        valid = {}
+        for key, shape in shapes.items():
+            shape = self._validated(key, shape)
+            if shape is not None:
+                valid[key] = shape
+        return valid
+
+    def upsert(self, key, shape: Dict):
+        """
+        Insert or replace one shape and its pieces in a single transaction;
+        raises ShapeFormatError for an invalid shape
+        """
+        with self.conn:
+            self._write(key, shape)
+
+    def import_shapes(self, shapes: Dict[str, Dict]):
+        """Upsert many shapes in one transaction (none if any is invalid)"""
+        with self.conn:
+            for key, shape in shapes.items():
+                self._write(key, shape)
+
+    def _write(self, key, shape: Dict):
+        shape = validate_shape(key, shape)
+        self.conn.execute(
+            "INSERT INTO shapes (key, name, difficulty) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET name = excluded.name, difficulty = excluded.difficulty",
+            (key, shape.get('name', key), shape.get('difficulty', 'medium')))
+        self.conn.execute("DELETE FROM pieces WHERE shape_key = ?", (key,))
+        self.conn.executemany(
+            "INSERT INTO pieces (shape_key, slot, color, x, y, angle, piece_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(key, slot, p['color'], float(p['center'][0]), float(p['center'][1]),
+              float(p.get('angle', 0)), p.get('piece_type', ''))
+             for slot, p in enumerate(shape.get('pieces', []))])
+
+    def delete(self, key):
+        """Remove one shape (its pieces go with it)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM shapes WHERE key = ?", (key,))
+
+    def shapes(self) -> 'LazyShapes':
+        """Dict-like view of the store that loads shapes on first access"""
+        return LazyShapes(self)
+
+    def close(self):
+        self.conn.close()
+
+
+class LazyShapes(MutableMapping):
+    """
+    The store as a {key: shape} mapping, for ShapeLibrary.shapes.
+    Only keys are read up front; each shape is read on first access and
+    then kept, so repeated lookups return the same dict. Assignments and
+    deletions are written through to the store.
+    """
+
+    def __init__(self, store: ShapeStore):
+        self.store = store
+        self._keys = dict.fromkeys(store.keys())  # Ordered set
+        self._loaded = {}
+
+    def __getitem__(self, key):
+        shape = self._loaded.get(key)
+        if shape is None:
+            if key not in self._keys:
+                raise KeyError(key)
+            shape = self.store.get(key)
+            if shape is None:
+                del self._keys[key]  # Deleted meanwhile, or invalid
+                raise KeyError(key)
+            self._loaded[key] = shape
+        return shape
+
+    def __setitem__(self, key, shape):
+        self.store.upsert(key, shape)
+        self._keys.setdefault(key)
+        self._loaded[key] = shape
+
+    def __delitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        self.store.delete(key)
+        del self._keys[key]
+        self._loaded.pop(key, None)
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def load_all(self):
+        """Read every shape not loaded yet in one pass (for whole-library scans)"""
+        if len(self._loaded) < len(self._keys):
+            shapes = self.store.get_all()
+            for key in list(self._keys):
+                if key in shapes:
+                    self._loaded.setdefault(key, shapes[key])
+                elif key not in self._loaded:
+                    del self._keys[key]  # Deleted meanwhile, or invalid
+
+    def items(self):
+        self.load_all()
+        return super().items()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+
+def open_shape_store(path=DEFAULT_DATABASE) -> ShapeStore:
+    """
+    The shape database for tools that add shapes. If it doesn't exist yet it
+    is created from the shapes the game loads now; from then on the game
+    loads the database.
+    """
+    if os.path.exists(path):
+        return ShapeStore(path)
+    from tangram_game import ShapeLibrary
+    shapes = dict(ShapeLibrary(database=None, pack_file=None).shapes)
+    store = ShapeStore(path)
+    store.import_shapes(shapes)
+    print(f"✓ Created {path} with {len(shapes)} shapes from the shape files")
+    print(f"  The game now loads {path} instead of shapes_config.py and shapes.json; "
+          f"delete it to go back to the files")
+    return store
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else 'list'
+    database = args.pop(0) if args and args[0].endswith('.db') else DEFAULT_DATABASE
+    store = ShapeStore(database)
+
+    if command == 'import':
+        sources = args or ['shapes_config.py']
+        for source in sources:
+            shapes = load_shape_file(source)
+            store.import_shapes(shapes)
+            print(f"✓ Imported {len(shapes)} shapes from {source}")
+        print(f"{database}: {len(store)} shapes")
+    elif command == 'list':
+        keys = store.find(difficulty=args[0]) if args else store.keys()
+        for key in keys:
+            shape = store.get(key)
+            print(f"  {key:<20} {shape['name']:<24} {shape['difficulty']:<8} {len(shape['pieces'])} pieces")
+    else:
+        print(__doc__)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
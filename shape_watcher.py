@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Shape watcher - reloads the shape library when its files change
+A background thread polls the source files' modification times. When
+they change it reloads the library on that thread (reading, validating
+and recompiling the pack), and the game swaps the result in between
+frames with take(), so editing shapes_config.py or shapes.json no
+longer needs a restart.
+"""
+
+import os
+import threading
+from typing import Callable, Sequence
+
+
+def file_signature(paths: Sequence[str]) -> tuple:
+    """(path, mtime, size) per file; missing files are included as missing"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+class ShapeWatcher:
+    """
+    Polls a list of files and calls reload() on its own thread when they
+    change. A change is acted on once the files have stayed the same for
+    one more poll, so a file still being saved isn't read half-written.
+    The reload result waits for take(); a failed reload is reported and
+    the current shapes stay in use.
+    """
+
+    INTERVAL = 0.5  # seconds between polls
+
+    def __init__(self, sources: Callable[[], Sequence[str]], reload: Callable, interval=INTERVAL):
+        """
+        sources: returns the files to watch (called every poll, so new files are picked up)
+        reload: builds the new library; its return value is what take() hands over
+        """
+        self.sources = sources
+        self.reload = reload
+        self.interval = interval
+        self.reloads = 0
+        self._signature = file_signature(sources())
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling in the background"""
+        self._thread = threading.Thread(target=self._run, name="ShapeWatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """Watcher thread: poll, wait for changes to settle, reload"""
+        seen = self._signature
+        while not self._stop.wait(self.interval):
+            signature = file_signature(self.sources())
+            if signature != seen:
+                seen = signature  # Still changing: check again next poll
+                continue
+            if signature == self._signature:
+                continue
+            self._signature = signature
+            try:
+                result = self.reload()
+            except Exception as e:
+                print(f"Warning: Could not reload shapes, keeping the current ones: {e}")
+                continue
+            with self._lock:
+                self._pending = result
+            self.reloads += 1
+
+    def take(self):
+        """The latest reload result not taken yet, or None (for the main thread)"""
+        with self._lock:
+            result, self._pending = self._pending, None
+        return result
+
+    def stop(self):
+        """Stop polling and wait for a reload in progress"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -7,15 +7,32 @@ Detects 7 colored tangram pieces and matches them to target shapes
 import cv2
 import numpy as np
 import pygame
-import json
 import time
+import os
+import threading
 from dataclasses import dataclass
 from typing import List, Tuple, Dict
 from enum import Enum
+from collections import OrderedDict
+
+from render_cache import SurfaceCache, TextCache, GlyphAtlas
+from camera_view import CameraView
+from video_recorder import VideoRecorder
+from shape_store import ShapeStore, DEFAULT_DATABASE
+from shape_pack import load_pack, PackedShapes, DEFAULT_PACK
+from shape_journal import ShapeJournal
+from shape_watcher import ShapeWatcher
+from detection_worker import DetectionWorker
+from shape_schema import load_shape_file, find_editor_dumps, from_library, validate_shape, ShapeFormatError
+from piece_renderer import target_polygons, draw_piece, render_piece_sprite
+from tangram_geometry import (piece_polygons, shape_polygons, shape_bounds, fit_bounds,
+                              SilhouetteRasterizer, fit_similarity, apply_similarity, convex_outline,
+                              polygon_area, convex_intersection_area, convex_gap, sweep_pairs,
+                              chirality, PARALLELOGRAM_OUTLINE, piece_outline)
 
 # Import shape configurations
 try:
-    from shapes_config import get_shape_pieces, get_all_shapes, PIECE_SIZES
+    import shapes_config
     USE_CONFIG = True
 except ImportError:
     USE_CONFIG = False
@@ -27,7 +44,9 @@ pygame.init()
 # Constants
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
-FPS = 30
+FPS = 60  # Display rate; detected pieces are interpolated between detections
+DETECTION_FPS = 30  # Camera detection rate
+RECORD_FPS = 30  # Frame rate of session recordings
 
 # Tangram piece colors (BGR format for OpenCV)
 PIECE_COLORS = {
@@ -56,6 +75,31 @@ PYGAME_COLORS = {
 }
 
 
+def layout_areas(size) -> Tuple[pygame.Rect, pygame.Rect]:
+    """Game area and info panel rects for a window size"""
+    width, height = size
+    return (pygame.Rect(50, 100, width - 500, height - 150),
+            pygame.Rect(width - 400, 100, 350, height - 150))
+
+
+def config_file():
+    """shapes_config.py's path, or None when there is no source file (frozen builds)"""
+    path = getattr(shapes_config, '__file__', None)
+    return path if path and os.path.exists(path) else None
+
+
+def load_config_shapes() -> Dict:
+    """
+    shapes_config.SHAPES through the shape schema. Read from the source file
+    when there is one, so edits show up without a restart; a PyInstaller
+    --onefile build only has the imported module.
+    """
+    path = config_file()
+    if path is not None:
+        return load_shape_file(path)
+    return from_library(shapes_config.SHAPES, 'shapes_config')
+
+
 class PieceType(Enum):
     LARGE_TRIANGLE = "large_triangle"
     MEDIUM_TRIANGLE = "medium_triangle"
@@ -64,6 +108,50 @@ class PieceType(Enum):
     PARALLELOGRAM = "parallelogram"
 
 
+# Rotational symmetry per piece type: (period in degrees, mirror offset in degrees).
+# A square looks the same every 90 degrees and a parallelogram every 180.
+# The parallelogram is the only chiral piece; flipped over, its long edges
+# line up with the target's when turned a further 90 degrees. The offset
+# only applies to detections measured as flipped (TangramPiece.mirrored).
+PIECE_SYMMETRY = {
+    PieceType.LARGE_TRIANGLE: (360.0, 0.0),
+    PieceType.MEDIUM_TRIANGLE: (360.0, 0.0),
+    PieceType.SMALL_TRIANGLE: (360.0, 0.0),
+    PieceType.SQUARE: (90.0, 0.0),
+    PieceType.PARALLELOGRAM: (180.0, 90.0),
+}
+
+# Handedness of an unflipped parallelogram (see tangram_geometry.chirality)
+PARALLELOGRAM_CHIRALITY = chirality(convex_outline(PARALLELOGRAM_OUTLINE))
+
+
+def symmetry_tables(piece_types, allow_mirror=True) -> Tuple[np.ndarray, np.ndarray]:
+    """Look up symmetry periods and mirror offsets for a sequence of piece type names"""
+    periods = np.full(len(piece_types), 360.0)
+    mirror_offsets = np.zeros(len(piece_types))
+    for i, name in enumerate(piece_types):
+        try:
+            period, mirror = PIECE_SYMMETRY[PieceType(name)]
+        except ValueError:
+            continue  # Unknown type: plain 360 degree wrap
+        periods[i] = period
+        if allow_mirror:
+            mirror_offsets[i] = mirror
+    return periods, mirror_offsets
+
+
+def symmetric_angle_diff(diff: np.ndarray, periods: np.ndarray, mirror_offsets=0.0) -> np.ndarray:
+    """
+    Smallest angle error (degrees) between poses, given raw angle
+    differences and per-element symmetry periods and mirror offsets
+    (all broadcastable). Pass the mirror offset only where the detected
+    piece is flipped; it is zero for pieces as they are.
+    Branch-free, so it runs over every pair at once.
+    """
+    err = np.abs(diff - mirror_offsets) % periods
+    return np.minimum(err, periods - err)
+
+
 @dataclass
 class TangramPiece:
     """Represents a detected tangram piece"""
@@ -73,13 +161,15 @@ class TangramPiece:
     contour: np.ndarray
     area: float
     piece_type: PieceType = None
+    mirrored: bool = False  # Turned over, measured from the contour's handedness
     
     def to_dict(self):
         return {
             'color': self.color,
             'center': self.center,
             'angle': self.angle,
-            'area': self.area
+            'area': self.area,
+            'piece_type': self.piece_type.value if self.piece_type else None
         }
 
 
@@ -107,20 +197,33 @@ class TangramDetector:
         self.cap = cv2.VideoCapture(camera_id)
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # Latest frame, and (when keep_labels is set) a label image with
+        # pixel value i + 1 where the mask of the i-th PIECE_COLORS entry is set
+        self.last_frame = None
+        self.keep_labels = False
+        self.last_labels = None
         
     def detect_pieces(self) -> List[TangramPiece]:
         """Detect all tangram pieces in the current frame"""
         ret, frame = self.cap.read()
         if not ret:
             return []
+        self.last_frame = frame
         
         # Convert to HSV for better color detection
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         
+        labels = None
+        if self.keep_labels:
+            if self.last_labels is None or self.last_labels.shape != frame.shape[:2]:
+                self.last_labels = np.zeros(frame.shape[:2], dtype=np.uint8)
+            labels = self.last_labels
+            labels.fill(0)
+        
         # Track best piece per color (only keep largest/best match per color)
         best_pieces = {}
         
-        for color_name, color_data in PIECE_COLORS.items():
+        for label, (color_name, color_data) in enumerate(PIECE_COLORS.items(), 1):
             # Create mask for this color
             mask = cv2.inRange(hsv, color_data['hsv_lower'], color_data['hsv_upper'])
             
@@ -128,6 +231,8 @@ class TangramDetector:
             kernel = np.ones((5, 5), np.uint8)
             mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
             mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+            if labels is not None:
+                labels[mask > 0] = label
             
             # Find contours
             contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -157,6 +262,8 @@ class TangramDetector:
                 
                 # Classify piece type based on area (approximate)
                 piece.piece_type = self._classify_piece(area, width, height)
+                # A parallelogram outline tells whether the piece is flipped over
+                piece.mirrored = chirality(convex_outline(contour)) == -PARALLELOGRAM_CHIRALITY
                 
                 # Only keep the largest/best piece per color to avoid duplicates
                 if color_name not in best_pieces or area > best_pieces[color_name].area:
@@ -188,40 +295,151 @@ class TangramDetector:
         self.cap.release()
 
 
+class PieceInterpolator:
+    """
+    Smooths detected-piece motion between detection updates.
+    Keeps the last two timestamped detection results and samples each
+    piece's center and angle at display time, so the display can run
+    faster than detection. By default it renders one detection interval
+    behind and interpolates; with an extrapolation horizon it renders at
+    the current time instead, extrapolating at most that far past the
+    latest detection.
+    """
+    
+    def __init__(self, extrapolation_horizon=0.0):
+        self.extrapolation_horizon = extrapolation_horizon
+        self._previous = ({}, None)
+        self._latest = ({}, None)
+    
+    def push(self, pieces: List[TangramPiece], timestamp: float):
+        """Record a detection result"""
+        self._previous = self._latest
+        self._latest = ({p.color: p for p in pieces}, timestamp)
+    
+    def clear(self):
+        """Forget detection history"""
+        self._previous = ({}, None)
+        self._latest = ({}, None)
+    
+    def sample(self, now: float) -> List[TangramPiece]:
+        """Pieces of the latest detection, posed for display at time now"""
+        latest, t1 = self._latest
+        previous, t0 = self._previous
+        if t0 is None or t1 is None or t1 <= t0:
+            return list(latest.values())
+        
+        interval = t1 - t0
+        if self.extrapolation_horizon > 0:
+            t = (min(now, t1 + self.extrapolation_horizon) - t0) / interval
+        else:
+            t = min(max((now - interval - t0) / interval, 0.0), 1.0)
+        
+        pieces = []
+        for color, piece in latest.items():
+            before = previous.get(color)
+            if before is None:
+                pieces.append(piece)  # Newly detected: nothing to interpolate from
+                continue
+            center = (
+                before.center[0] + (piece.center[0] - before.center[0]) * t,
+                before.center[1] + (piece.center[1] - before.center[1]) * t
+            )
+            # Turn the short way round
+            turn = (piece.angle - before.angle + 180) % 360 - 180
+            angle = (before.angle + turn * t) % 360
+            pieces.append(TangramPiece(color, center, angle, piece.contour, piece.area, piece.piece_type,
+                                       piece.mirrored))
+        return pieces
+
+
 class ShapeLibrary:
     """Manages target shapes and patterns"""
     
-    def __init__(self, filename='shapes.json'):
+    def __init__(self, filename='shapes.json', database=DEFAULT_DATABASE, pack_file=DEFAULT_PACK):
         self.filename = filename
+        # Saves append to a journal next to the JSON file (see shape_journal.py)
+        self.journal = ShapeJournal(filename)
+        # Shapes from the files are served from a compiled pack (see shape_pack.py)
+        self.pack_file = pack_file
+        # A shape database, once imported (see shape_store.py), replaces the files
+        self.store = ShapeStore(database) if database and os.path.exists(database) else None
+        if self.store is not None:
+            print(f"Note: Using the shape database {database}; shapes_config.py, shapes.json and "
+                  f"exported shape files are ignored and not watched (delete {database} to use them)")
+        # Held while a reload (on the watcher thread) reads self.shapes and
+        # while the main thread swaps it out or adds to it
+        self._lock = threading.Lock()
         self.shapes = self.load_shapes()
         
-    def load_shapes(self) -> Dict:
-        """Load shapes from config file or JSON file"""
+    def load_shapes(self, repair=True) -> Dict:
+        """
+        Load shapes from the shape database, config file or JSON file.
+        repair=False leaves the files untouched (see ShapeJournal.load)
+        """
+        if self.store is not None:
+            shapes = self.store.shapes()
+            print(f"✓ Opened {len(shapes)} shapes in {self.store.path}")
+            return shapes
+        
+        if self.pack_file:
+            try:
+                shapes = load_pack(self.pack_file, self.source_files(),
+                                   lambda: self.load_source_shapes(repair))
+                print(f"✓ Loaded {len(shapes)} shapes from {self.pack_file}")
+                return shapes
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not use shape pack {self.pack_file}: {e}")
+        return self.load_source_shapes(repair)
+    
+    def source_files(self) -> List[str]:
+        """Files the shapes are loaded from"""
+        sources = [self.filename, self.journal.journal_path, self.journal.compacting_path]
+        if USE_CONFIG and config_file():
+            sources.insert(0, config_file())
+        return sources + find_editor_dumps(os.path.dirname(self.filename) or '.')
+    
+    def load_source_shapes(self, repair=True) -> Dict:
+        """Load shapes from config file or JSON file (with its journal), plus editor dumps"""
+        # All formats go through the shape_schema adapters, which validate
+        # them and cache the conversion by file hash
+        try:
+            snapshot = load_shape_file(self.filename)
+        except FileNotFoundError:
+            snapshot = None
+        except ShapeFormatError as e:
+            print(f"Warning: Could not load {self.filename}: {e}")
+            snapshot = None
+        saved = self.journal.load(snapshot, repair)
+        
+        shapes = None
         # First try to load from shapes_config.py (preferred)
         if USE_CONFIG:
             try:
-                config_shapes = get_all_shapes()
-                # Convert config format to internal format
-                shapes = {}
-                for name, shape_data in config_shapes.items():
-                    pieces = get_shape_pieces(name)
-                    shapes[name] = {
-                        'name': shape_data['name'],
-                        'difficulty': shape_data['difficulty'],
-                        'pieces': pieces
-                    }
+                shapes = load_config_shapes()
                 print(f"✓ Loaded {len(shapes)} shapes from shapes_config.py")
-                return shapes
+                # Shapes saved from the editor or the game that the config doesn't define
+                for key, shape in (saved or {}).items():
+                    shapes.setdefault(key, shape)
             except Exception as e:
                 print(f"Warning: Could not load shapes_config.py: {e}")
         
         # Fall back to JSON file
-        try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            # Create default shapes
-            return self.create_default_shapes()
+        if shapes is None:
+            if saved is None:
+                # Create default shapes
+                return self.create_default_shapes()
+            shapes = saved
+        
+        # Editor dumps (shape_<name>_<time>.json) next to the JSON file
+        for path in find_editor_dumps(os.path.dirname(self.filename) or '.'):
+            try:
+                for key, shape in load_shape_file(path).items():
+                    if key in shapes:
+                        key = os.path.splitext(os.path.basename(path))[0]
+                    shapes.setdefault(key, shape)
+            except ShapeFormatError as e:
+                print(f"Warning: Could not load {path}: {e}")
+        return shapes
     
     def create_default_shapes(self) -> Dict:
         """Create default shape library including the swan"""
@@ -282,21 +500,763 @@ class ShapeLibrary:
         self.save_shapes(shapes)
         return shapes
     
+    def reload(self):
+        """
+        Load the shapes again from their files, e.g. on a ShapeWatcher thread.
+        Returns (shapes, keys of added, changed or removed shapes) for
+        replace_shapes(); self.shapes is not touched.
+        """
+        if USE_CONFIG:
+            # A config that doesn't load must fail the reload rather than
+            # fall back to the JSON shapes alone
+            load_config_shapes()
+        shapes = self.load_shapes(repair=False)
+        with self._lock:  # The current pack mustn't be closed mid-comparison
+            old = self.shapes
+            changed = {key for key in shapes if key not in old or old[key] != shapes[key]}
+            changed.update(key for key in old if key not in shapes)
+        return shapes, changed
+    
+    def replace_shapes(self, shapes):
+        """Swap in reloaded shapes; closes the pack the old ones were read from"""
+        with self._lock:
+            old, self.shapes = self.shapes, shapes
+            if isinstance(old, PackedShapes) and old.pack is not getattr(shapes, 'pack', None):
+                old.pack.close()
+    
     def save_shapes(self, shapes=None):
-        """Save shapes to JSON file"""
+        """Save the whole library to the JSON file (atomically)"""
         if shapes is None:
-            shapes = self.shapes
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(shapes, f, indent=2, ensure_ascii=False)
+            shapes = dict(self.shapes)
+        self.journal.write_snapshot(shapes)
     
     def add_shape(self, name, pieces, difficulty='medium'):
         """Add a new shape to the library"""
-        self.shapes[name.lower()] = {
+        key = name.lower()
+        shape = validate_shape(key, {
             'name': name,
             'difficulty': difficulty,
             'pieces': [p if isinstance(p, dict) else p.to_dict() for p in pieces]
-        }
-        self.save_shapes()
+        })
+        with self._lock:
+            self.shapes[key] = shape
+        # The shape database saves each shape on assignment; otherwise
+        # the shape is appended to the journal
+        if self.store is None:
+            self.journal.upsert(key, self.shapes[key])
+
+
+@dataclass
+class MatchResult:
+    """Score and matched-piece set for one detection update"""
+    score: float
+    matched_colors: set
+    piece_scores: np.ndarray  # best score per target piece (0-100)
+
+
+class MatchEngine:
+    """
+    Computes target/detection pair metrics once per detection update
+    and serves both the numeric score and the matched-piece set.
+    Results are cached until the detections or the target shape change,
+    so draw() can run faster than detection without recomputation.
+    """
+    
+    # Scoring: position falls off linearly to zero at POSITION_RANGE pixels
+    POSITION_RANGE = 100.0
+    POSITION_WEIGHT = 0.6
+    ANGLE_WEIGHT = 0.4
+    MIN_PIECE_SCORE = 30  # Minimum score to count a piece as matched
+    
+    # Highlighting: position within 50 pixels and angle within 30 degrees
+    # These are in CAMERA COORDINATES (unscaled)
+    POSITION_THRESHOLD = 50
+    ANGLE_THRESHOLD = 30
+    
+    COLOR_INDEX = {name: i for i, name in enumerate(PIECE_COLORS)}
+    
+    def __init__(self, allow_mirror=True):
+        self.allow_mirror = allow_mirror
+        self._detected = None
+        self._target = None
+        self._target_arrays = None
+        self.result = MatchResult(0.0, set(), np.zeros(0))
+    
+    def match(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Return the match result, recomputing only if inputs changed"""
+        if detected is self._detected and target is self._target:
+            return self.result
+        
+        if target is not self._target:
+            self._target_arrays = self._pack_target(target)
+        self._detected = detected
+        self._target = target
+        self.result = self._compute(detected, target)
+        return self.result
+    
+    def invalidate(self):
+        """Drop cached results (e.g. after the shape library changed)"""
+        self._detected = None
+        self._target = None
+    
+    def _pack_target(self, target: List[Dict]):
+        """Pack target pieces into arrays once per shape"""
+        colors = np.array([self.COLOR_INDEX.get(p['color'], -1) for p in target], dtype=np.int32)
+        centers = np.array([p['center'] for p in target], dtype=np.float64).reshape(-1, 2)
+        angles = np.array([p.get('angle', 0) for p in target], dtype=np.float64)
+        periods, mirror_offsets = symmetry_tables(
+            [p.get('piece_type', '') for p in target], self.allow_mirror)
+        return colors, centers, angles, periods[:, None], mirror_offsets[:, None]
+    
+    def _compute(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Compute all pair metrics in one pass"""
+        if not detected or not target:
+            return MatchResult(0.0, set(), np.zeros(len(target) if target else 0))
+        
+        t_colors, t_centers, t_angles, t_periods, t_mirrors = self._target_arrays
+        d_colors = np.array([self.COLOR_INDEX.get(p.color, -2) for p in detected], dtype=np.int32)
+        d_centers = np.array([p.center for p in detected], dtype=np.float64)
+        d_angles = np.array([p.angle for p in detected], dtype=np.float64)
+        d_mirrored = np.array([p.mirrored for p in detected], dtype=np.float64)
+        
+        # Pair metrics, shape (targets, detections)
+        same_color = t_colors[:, None] == d_colors[None, :]
+        delta = d_centers[None, :, :] - t_centers[:, None, :]
+        pos_diff = np.sqrt((delta ** 2).sum(axis=2))
+        angle_diff = symmetric_angle_diff(d_angles[None, :] - t_angles[:, None], t_periods,
+                                          t_mirrors * d_mirrored[None, :])
+        
+        # Numeric score: best same-color pair per target piece
+        pos_score = np.maximum(0, self.POSITION_RANGE - pos_diff) / self.POSITION_RANGE
+        angle_score = np.maximum(0, 1 - angle_diff / 180.0)
+        pair_scores = (pos_score * self.POSITION_WEIGHT + angle_score * self.ANGLE_WEIGHT) * 100
+        pair_scores = np.where(same_color, pair_scores, 0.0)
+        piece_scores = pair_scores.max(axis=1)
+        counted = piece_scores > self.MIN_PIECE_SCORE
+        score = float(piece_scores[counted].sum() / len(target))
+        
+        # Matched-piece set: any same-color pair within both thresholds
+        close = same_color & (pos_diff <= self.POSITION_THRESHOLD) & (angle_diff <= self.ANGLE_THRESHOLD)
+        matched_colors = {target[i]['color'] for i in np.flatnonzero(close.any(axis=1))}
+        
+        return MatchResult(score, matched_colors, piece_scores)
+
+
+class SilhouetteScorer:
+    """
+    Raster-overlap scoring mode: compares the footprint of the detected
+    pieces with the target silhouette on a low-resolution grid.
+    Target silhouettes are rasterized once per shape and scale and cached;
+    each detection update rasterizes only the detected polygons.
+    Score is the IoU (0-100); matched pieces are those whose target area is
+    covered well enough by the detected piece of the same color.
+    
+    Shape coordinates use nominal piece sizes, while real pieces look as
+    large as the camera's distance makes them. By default the scale is
+    calibrated from the detected piece areas; the target is enlarged about
+    its middle until its pieces are as large as the detected ones.
+    """
+    
+    COVERAGE_THRESHOLD = 0.6  # Fraction of a target piece that must be covered
+    MAX_CACHED_SHAPES = 32
+    SCALE_STEP = 0.1  # Calibrated scales are rounded to this, so silhouettes are reused
+    
+    COLOR_INDEX = MatchEngine.COLOR_INDEX
+    
+    def __init__(self, scale=None, cell_size=4, frame_size=(640, 480)):
+        """scale: target size relative to shape coordinates; None calibrates it from the detections"""
+        self.fixed_scale = scale
+        self.scale = scale or 1.0
+        self.rasterizer = SilhouetteRasterizer(frame_size, cell_size)
+        self._silhouettes = OrderedDict()
+        self._detected = None
+        self._target = None
+        self.result = MatchResult(0.0, set(), np.zeros(0))
+    
+    def match(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Return the overlap result, recomputing only if inputs changed"""
+        if detected is self._detected and target is self._target:
+            return self.result
+        self._detected = detected
+        self._target = target
+        self.result = self._compute(detected, target)
+        return self.result
+    
+    def invalidate(self):
+        """Drop cached silhouettes and results (e.g. after the shape library changed)"""
+        self._silhouettes.clear()
+        self._detected = None
+        self._target = None
+    
+    def target_silhouette(self, target: List[Dict]):
+        """Cached (mask, area, per-piece ROIs) for a target shape at the current scale"""
+        key = (id(target), self.scale)
+        entry = self._silhouettes.get(key)
+        if entry is not None and entry[0] is target:
+            self._silhouettes.move_to_end(key)
+            return entry[1]
+        
+        mask = self.rasterizer.blank()
+        polygons = shape_polygons(target, self.scale)
+        if self.scale != 1.0:
+            # Spread the pieces apart as much as they grew, about the shape's middle
+            x0, y0, x1, y1 = shape_bounds(target)
+            centers = np.array([p['center'] for p in target], dtype=np.float64)
+            polygons = polygons + ((centers - ((x0 + x1) / 2, (y0 + y1) / 2)) * (self.scale - 1))[:, None, :]
+        self.rasterizer.fill(mask, polygons)
+        
+        # Per-piece masks cropped to their bounding boxes
+        pieces = []
+        rows, cols = mask.shape
+        for piece, polygon in zip(target, polygons):
+            piece_mask = self.rasterizer.fill(self.rasterizer.blank(), [polygon])
+            x, y, w, h = cv2.boundingRect(piece_mask)
+            roi = (slice(y, y + h), slice(x, x + w))
+            area = cv2.countNonZero(piece_mask[roi]) if w and h else 0
+            pieces.append((self.COLOR_INDEX.get(piece['color'], -1) + 1, roi, piece_mask[roi].copy(), area))
+        
+        silhouette = (mask, cv2.countNonZero(mask), pieces)
+        self._silhouettes[key] = (target, silhouette)
+        if len(self._silhouettes) > self.MAX_CACHED_SHAPES:
+            self._silhouettes.popitem(last=False)
+        return silhouette
+    
+    def calibrate(self, detected: List[TangramPiece], target: List[Dict]) -> float:
+        """Scale that makes the target's pieces as large as the detected pieces of the same colors"""
+        areas = {p['color']: abs(polygon_area(piece_outline(p.get('piece_type', '')))) for p in target}
+        detected_area = target_area = 0.0
+        for piece in detected:
+            if piece.color in areas and piece.area > 0:
+                detected_area += piece.area
+                target_area += areas[piece.color]
+        if not target_area:
+            return self.scale
+        scale = np.sqrt(detected_area / target_area)
+        return max(self.SCALE_STEP, round(scale / self.SCALE_STEP) * self.SCALE_STEP)
+    
+    def _detected_polygons(self, detected: List[TangramPiece]):
+        """Polygons for detected pieces: the contour if present, else the canonical outline"""
+        polygons = []
+        for piece in detected:
+            if piece.contour is not None and len(piece.contour) >= 3:
+                polygons.append(piece.contour)
+            elif piece.piece_type is not None:
+                polygons.append(piece_polygons([piece.piece_type.value], [piece.center],
+                                               [piece.angle], self.scale)[0])
+            else:
+                polygons.append(None)
+        return polygons
+    
+    def _compute(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Rasterize detections and compare them with the cached silhouette"""
+        if not target:
+            return MatchResult(0.0, set(), np.zeros(0))
+        if self.fixed_scale is None and detected:
+            self.scale = self.calibrate(detected, target)
+        target_mask, target_area, pieces = self.target_silhouette(target)
+        if not detected:
+            return MatchResult(0.0, set(), np.zeros(len(target)))
+        
+        # Label image: each detected piece filled with its color index + 1
+        labels = self.rasterizer.blank()
+        for piece, polygon in zip(detected, self._detected_polygons(detected)):
+            if polygon is not None:
+                self.rasterizer.fill(labels, [polygon], self.COLOR_INDEX.get(piece.color, -1) + 1)
+        
+        detected_mask = cv2.compare(labels, 0, cv2.CMP_GT)
+        intersection = cv2.countNonZero(cv2.bitwise_and(detected_mask, target_mask))
+        union = cv2.countNonZero(cv2.bitwise_or(detected_mask, target_mask))
+        iou = intersection / union if union else 0.0
+        
+        # Per-piece coverage by the same-colored detection
+        coverage = np.zeros(len(target))
+        for i, (color_label, roi, piece_mask, area) in enumerate(pieces):
+            if area:
+                same_color = labels[roi] == color_label
+                coverage[i] = np.count_nonzero(same_color & (piece_mask > 0)) / area
+        
+        matched_colors = {target[i]['color'] for i in np.flatnonzero(coverage >= self.COVERAGE_THRESHOLD)}
+        return MatchResult(iou * 100, matched_colors, coverage * 100)
+
+
+class IncrementalMatchEngine(MatchEngine):
+    """
+    MatchEngine that only re-evaluates pieces whose pose changed.
+    Each detection's contribution to the targets of its color is cached,
+    keyed by its quantized pose (center and angle buckets). After a
+    detection update only detections that moved past a bucket are scored;
+    per-target best scores and the total are then updated for the
+    affected targets only. Counters track evaluated vs skipped pairs.
+    """
+    
+    POSITION_EPSILON = 2.0  # pixels
+    ANGLE_EPSILON = 2.0  # degrees
+    
+    def __init__(self, allow_mirror=True):
+        super().__init__(allow_mirror)
+        self.evaluated = 0
+        self.skipped = 0
+        self.evaluated_per_second = 0.0
+        self.skipped_per_second = 0.0
+        self._window_start = time.time()
+        self._window_counts = (0, 0)
+        self._reset_columns()
+    
+    def _reset_columns(self):
+        """Forget cached contributions (new target shape)"""
+        self._columns = {}
+        self._row_best = None
+        self._row_close = None
+        self._rows_by_color = {}
+        self._column_target = None
+    
+    def invalidate(self):
+        """Drop cached results and contributions"""
+        super().invalidate()
+        self._reset_columns()
+    
+    def pose_key(self, piece: TangramPiece):
+        """Quantized pose used as the cache key for a detection"""
+        return (
+            piece.color,
+            int(round(piece.center[0] / self.POSITION_EPSILON)),
+            int(round(piece.center[1] / self.POSITION_EPSILON)),
+            int(round((piece.angle % 360) / self.ANGLE_EPSILON)),
+            piece.mirrored
+        )
+    
+    def _compute(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Score only detections with a new quantized pose"""
+        if not target:
+            return MatchResult(0.0, set(), np.zeros(0))
+        
+        t_colors, t_centers, t_angles, t_periods, t_mirrors = self._target_arrays
+        if self._column_target is not target:
+            self._reset_columns()
+            self._column_target = target
+            self._row_best = np.zeros(len(target))
+            self._row_close = np.zeros(len(target), dtype=bool)
+            for color in np.unique(t_colors):
+                self._rows_by_color[int(color)] = np.flatnonzero(t_colors == color)
+        
+        columns = {}
+        for piece in detected:
+            key = self.pose_key(piece)
+            if key in columns:
+                continue
+            rows = self._rows_by_color.get(self.COLOR_INDEX.get(piece.color, -2))
+            if rows is None:
+                continue  # No target piece of this color
+            column = self._columns.get(key)
+            if column is not None:
+                self.skipped += len(rows)
+            else:
+                column = self._score_column(piece, rows, t_centers, t_angles, t_periods, t_mirrors)
+                self.evaluated += len(rows)
+            columns[key] = column
+        
+        # Only targets touched by an added or removed detection change
+        changed = self._columns.keys() ^ columns.keys()
+        affected = set()
+        for key in changed:
+            column = columns.get(key) or self._columns[key]
+            affected.update(column[0].tolist())
+        self._columns = columns
+        if affected:
+            for row in affected:
+                self._row_best[row] = 0.0
+                self._row_close[row] = False
+            for rows, scores, close in columns.values():
+                for row, score, is_close in zip(rows, scores, close):
+                    if row in affected:
+                        self._row_best[row] = max(self._row_best[row], score)
+                        self._row_close[row] |= is_close
+        
+        self._update_rates()
+        counted = self._row_best > self.MIN_PIECE_SCORE
+        score = float(self._row_best[counted].sum() / len(target))
+        matched_colors = {target[i]['color'] for i in np.flatnonzero(self._row_close)}
+        return MatchResult(score, matched_colors, self._row_best.copy())
+    
+    def _score_column(self, piece, rows, t_centers, t_angles, t_periods, t_mirrors):
+        """Scores and threshold flags of one detection against its same-color targets"""
+        delta = t_centers[rows] - np.asarray(piece.center, dtype=np.float64)
+        pos_diff = np.sqrt((delta ** 2).sum(axis=1))
+        mirror_offsets = t_mirrors[rows, 0] if piece.mirrored else 0.0
+        angle_diff = symmetric_angle_diff(piece.angle - t_angles[rows], t_periods[rows, 0], mirror_offsets)
+        pos_score = np.maximum(0, self.POSITION_RANGE - pos_diff) / self.POSITION_RANGE
+        angle_score = np.maximum(0, 1 - angle_diff / 180.0)
+        scores = (pos_score * self.POSITION_WEIGHT + angle_score * self.ANGLE_WEIGHT) * 100
+        close = (pos_diff <= self.POSITION_THRESHOLD) & (angle_diff <= self.ANGLE_THRESHOLD)
+        return rows, scores, close
+    
+    def _update_rates(self):
+        """Roll the per-second evaluated/skipped counters"""
+        now = time.time()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            evaluated, skipped = self._window_counts
+            self.evaluated_per_second = (self.evaluated - evaluated) / elapsed
+            self.skipped_per_second = (self.skipped - skipped) / elapsed
+            self._window_start = now
+            self._window_counts = (self.evaluated, self.skipped)
+
+
+class AlignedScorer(MatchEngine):
+    """
+    Pose-invariant scoring mode: first fits the best similarity transform
+    (translation, rotation, optional uniform scale) from the detected
+    piece centers onto the target centers, pairing pieces by color, then
+    scores the residuals like MatchEngine. Kids can build anywhere on the table.
+    """
+    
+    MIN_PAIRS_FOR_ROTATION = 3  # Fewer pairs fit translation only
+    
+    def __init__(self, with_scale=False, allow_mirror=True):
+        super().__init__(allow_mirror)
+        self.with_scale = with_scale
+        self.alignment = (1.0, 0.0, np.zeros(2))  # scale, angle, translation
+    
+    def _compute(self, detected: List[TangramPiece], target: List[Dict]) -> MatchResult:
+        """Align detections onto the target, then score the residuals"""
+        if not detected or not target:
+            return super()._compute(detected, target)
+        
+        target_colors, target_centers = self._target_arrays[0], self._target_arrays[1]
+        detected_colors = np.array([self.COLOR_INDEX.get(p.color, -2) for p in detected])
+        pairs = np.nonzero(detected_colors[:, None] == target_colors[None, :])
+        if len(pairs[0]) == 0:
+            return super()._compute(detected, target)
+        
+        detected_centers = np.array([p.center for p in detected], dtype=np.float64)
+        src = detected_centers[pairs[0]]
+        dst = target_centers[pairs[1]]
+        if len(src) >= self.MIN_PAIRS_FOR_ROTATION:
+            self.alignment = fit_similarity(src, dst, self.with_scale)
+        else:
+            self.alignment = (1.0, 0.0, dst.mean(axis=0) - src.mean(axis=0))
+        
+        scale, angle, translation = self.alignment
+        aligned_centers = apply_similarity(detected_centers, scale, angle, translation)
+        aligned = [
+            TangramPiece(p.color, tuple(c), (p.angle - angle) % 360, p.contour, p.area, p.piece_type, p.mirrored)
+            for p, c in zip(detected, aligned_centers)
+        ]
+        return super()._compute(aligned, target)
+
+
+class ShapeRecognizer:
+    """
+    Free-play recognition: scores the current detections against every
+    shape in the library at once. The library is packed once into
+    (shapes x colors) arrays; each update runs one batched pose-invariant
+    alignment and scoring pass, so cost stays flat per shape as the
+    library grows. Scoring follows MatchEngine (including symmetry).
+    """
+    
+    MIN_PAIRS_FOR_ROTATION = AlignedScorer.MIN_PAIRS_FOR_ROTATION
+    COLOR_INDEX = MatchEngine.COLOR_INDEX
+    # Per-shape arrays, first axis indexed like shape_keys
+    ARRAYS = ('centers', 'angles', 'periods', 'mirror_offsets', 'present')
+    
+    def __init__(self, shapes: Dict = None, allow_mirror=True):
+        self.allow_mirror = allow_mirror
+        self._detected = None
+        self.result = (None, 0.0)
+        self.pack(shapes or {})
+    
+    def pack(self, shapes: Dict):
+        """Pack all library shapes into arrays indexed by [shape, color slot]"""
+        items = list(shapes.items())  # One pass: a shape database reads them all in one query
+        self.shape_keys = [key for key, _ in items]
+        self._rows = {key: s for s, key in enumerate(self.shape_keys)}
+        self._allocate(len(items))
+        for s, (_, shape) in enumerate(items):
+            self._pack_row(s, shape['pieces'])
+        self._finish()
+    
+    def update(self, shapes: Dict, changed):
+        """Repack only the added, edited or removed shapes among changed keys"""
+        removed = {key for key in changed if key in self._rows and key not in shapes}
+        if removed:
+            keep = np.array([key not in removed for key in self.shape_keys])
+            self.shape_keys = [key for key in self.shape_keys if key not in removed]
+            self._rows = {key: s for s, key in enumerate(self.shape_keys)}
+            for name in self.ARRAYS:
+                setattr(self, name, getattr(self, name)[keep])
+        
+        added = [key for key in changed if key in shapes and key not in self._rows]
+        if added:
+            old = {name: getattr(self, name) for name in self.ARRAYS}
+            count = len(self.shape_keys)
+            self._allocate(count + len(added))
+            for name, array in old.items():
+                getattr(self, name)[:count] = array
+            for key in added:
+                self._rows[key] = len(self.shape_keys)
+                self.shape_keys.append(key)
+        
+        for key in changed:
+            if key in shapes:
+                row = self._rows[key]
+                self._clear_row(row)
+                self._pack_row(row, shapes[key]['pieces'])
+        self._finish()
+    
+    def _allocate(self, count):
+        slots = len(self.COLOR_INDEX)
+        self.centers = np.zeros((count, slots, 2))
+        self.angles = np.zeros((count, slots))
+        self.periods = np.full((count, slots), 360.0)
+        self.mirror_offsets = np.zeros((count, slots))
+        self.present = np.zeros((count, slots), dtype=bool)
+    
+    def _clear_row(self, s):
+        self.centers[s] = 0.0
+        self.angles[s] = 0.0
+        self.periods[s] = 360.0
+        self.mirror_offsets[s] = 0.0
+        self.present[s] = False
+    
+    def _pack_row(self, s, pieces):
+        periods, mirrors = symmetry_tables([p.get('piece_type', '') for p in pieces], self.allow_mirror)
+        for piece, period, mirror in zip(pieces, periods, mirrors):
+            slot = self.COLOR_INDEX.get(piece['color'])
+            if slot is None:
+                continue  # Colors outside the palette can never be detected
+            self.centers[s, slot] = piece['center']
+            self.angles[s, slot] = piece.get('angle', 0)
+            self.periods[s, slot] = period
+            self.mirror_offsets[s, slot] = mirror
+            self.present[s, slot] = True
+    
+    def _finish(self):
+        self.piece_counts = np.maximum(self.present.sum(axis=1), 1)
+        self._detected = None
+    
+    def recognize(self, detected: List[TangramPiece]):
+        """Return (best shape key or None, score 0-100), cached per detection update"""
+        if detected is self._detected:
+            return self.result
+        self._detected = detected
+        scores = self.score_all(detected)
+        if len(scores) == 0 or scores.max() <= 0:
+            self.result = (None, 0.0)
+        else:
+            best = int(scores.argmax())
+            self.result = (self.shape_keys[best], float(scores[best]))
+        return self.result
+    
+    def score_all(self, detected: List[TangramPiece]) -> np.ndarray:
+        """Score the detections against every packed shape, shape (shapes,)"""
+        slots = len(self.COLOR_INDEX)
+        if not detected or not self.shape_keys:
+            return np.zeros(len(self.shape_keys))
+        
+        # Detections by color slot (the detector keeps one piece per color)
+        det_centers = np.zeros((slots, 2))
+        det_angles = np.zeros(slots)
+        det_mirrored = np.zeros(slots)
+        seen = np.zeros(slots, dtype=bool)
+        for piece in detected:
+            slot = self.COLOR_INDEX.get(piece.color)
+            if slot is not None:
+                det_centers[slot] = piece.center
+                det_angles[slot] = piece.angle
+                det_mirrored[slot] = piece.mirrored
+                seen[slot] = True
+        
+        # Batched closed-form alignment of detections onto each shape
+        weights = (self.present & seen[None, :]).astype(np.float64)
+        pairs = weights.sum(axis=1)
+        norm = np.maximum(pairs, 1)[:, None]
+        src_mean = weights @ det_centers / norm
+        dst_mean = (weights[:, :, None] * self.centers).sum(axis=1) / norm
+        src = det_centers[None, :, :] - src_mean[:, None, :]
+        dst = self.centers - dst_mean[:, None, :]
+        dot = (weights * (src * dst).sum(axis=2)).sum(axis=1)
+        cross = (weights * (src[:, :, 0] * dst[:, :, 1] - src[:, :, 1] * dst[:, :, 0])).sum(axis=1)
+        theta = np.where(pairs >= self.MIN_PAIRS_FOR_ROTATION, np.arctan2(cross, dot), 0.0)
+        
+        cos_t, sin_t = np.cos(theta)[:, None], np.sin(theta)[:, None]
+        aligned_x = cos_t * src[:, :, 0] - sin_t * src[:, :, 1] + dst_mean[:, 0:1]
+        aligned_y = sin_t * src[:, :, 0] + cos_t * src[:, :, 1] + dst_mean[:, 1:2]
+        pos_diff = np.hypot(aligned_x - self.centers[:, :, 0], aligned_y - self.centers[:, :, 1])
+        
+        # Screen angles turn the opposite way to the matrix rotation
+        aligned_angles = det_angles[None, :] - np.degrees(theta)[:, None]
+        angle_diff = symmetric_angle_diff(aligned_angles - self.angles, self.periods,
+                                          self.mirror_offsets * det_mirrored[None, :])
+        
+        pos_score = np.maximum(0, MatchEngine.POSITION_RANGE - pos_diff) / MatchEngine.POSITION_RANGE
+        angle_score = np.maximum(0, 1 - angle_diff / 180.0)
+        piece_scores = (pos_score * MatchEngine.POSITION_WEIGHT + angle_score * MatchEngine.ANGLE_WEIGHT) * 100
+        piece_scores = np.where(weights > 0, piece_scores, 0.0)
+        piece_scores = np.where(piece_scores > MatchEngine.MIN_PIECE_SCORE, piece_scores, 0.0)
+        return piece_scores.sum(axis=1) / self.piece_counts
+
+
+@dataclass
+class LayoutReport:
+    """Physical validity of a detected layout"""
+    overlaps: List[Tuple[str, str, float]]  # (color, color, overlap area)
+    gaps: List[Tuple[str, str, float]]  # (color, color, gap width) for nearby pairs
+    floating: set  # colors of pieces not touching any other piece
+    validity: float  # 0-1 factor applied to the score
+
+
+class LayoutChecker:
+    """
+    Checks that detected pieces form a physically valid layout:
+    measures pairwise overlap areas and gap widths between pieces.
+    A sort-and-sweep over bounding boxes finds nearby pairs, then exact
+    convex clipping measures them. Overlapping or floating pieces lower
+    the validity factor, so they cannot reach a winning score.
+    """
+    
+    CONNECT_DISTANCE = 12.0  # Pieces closer than this (pixels) count as touching
+    OVERLAP_TOLERANCE = 0.05  # Overlap allowed for detection noise (fraction of smaller piece)
+    OVERLAP_PENALTY = 1.0  # Validity lost per unit of excess overlap fraction
+    FLOATING_PENALTY = 0.1  # Validity lost per floating piece
+    
+    def __init__(self):
+        self._detected = None
+        self.report = LayoutReport([], [], set(), 1.0)
+    
+    def check(self, detected: List[TangramPiece]) -> LayoutReport:
+        """Return the layout report, recomputing only for a new detection update"""
+        if detected is self._detected:
+            return self.report
+        self._detected = detected
+        self.report = self._compute(detected)
+        return self.report
+    
+    def _outline(self, piece: TangramPiece):
+        """Convex outline of a detected piece in camera coordinates"""
+        if piece.contour is not None and len(piece.contour) >= 3:
+            return convex_outline(piece.contour)
+        if piece.piece_type is not None:
+            return convex_outline(piece_polygons([piece.piece_type.value], [piece.center], [piece.angle])[0])
+        return None
+    
+    def _compute(self, detected: List[TangramPiece]) -> LayoutReport:
+        """Broad-phase sweep, then exact overlap and gap measurement"""
+        pieces, outlines = [], []
+        for piece in detected:
+            outline = self._outline(piece)
+            if outline is not None:
+                pieces.append(piece)
+                outlines.append(outline)
+        if len(outlines) < 2:
+            return LayoutReport([], [], set(), 1.0)
+        
+        boxes = []
+        for outline in outlines:
+            xs = [x for x, _ in outline]
+            ys = [y for _, y in outline]
+            boxes.append((min(xs), min(ys), max(xs), max(ys)))
+        areas = [polygon_area(outline) for outline in outlines]
+        
+        overlaps, gaps = [], []
+        touching = set()
+        excess_overlap = 0.0
+        for i, j in sweep_pairs(boxes, self.CONNECT_DISTANCE):
+            area = convex_intersection_area(outlines[i], outlines[j])
+            if area > 0:
+                overlaps.append((pieces[i].color, pieces[j].color, area))
+                touching.update((i, j))
+                fraction = area / max(min(areas[i], areas[j]), 1e-9)
+                excess_overlap += max(0.0, fraction - self.OVERLAP_TOLERANCE)
+                continue
+            gap = convex_gap(outlines[i], outlines[j])
+            gaps.append((pieces[i].color, pieces[j].color, gap))
+            if gap <= self.CONNECT_DISTANCE:
+                touching.update((i, j))
+        
+        floating = {pieces[i].color for i in range(len(pieces)) if i not in touching}
+        validity = 1.0 - self.OVERLAP_PENALTY * excess_overlap - self.FLOATING_PENALTY * len(floating)
+        return LayoutReport(overlaps, gaps, floating, max(0.0, validity))
+
+
+class ScoreStabilizer:
+    """
+    Smooths the per-frame score and debounces victory.
+    Keeps fixed-size ring buffers of recent scores and matched sets, a
+    running sum for the smoothed score and per-color match counts, so
+    every update is O(1) with no per-frame list growth. Victory starts
+    after VICTORY_FRAMES consecutive qualifying frames and ends after as
+    many consecutive non-qualifying ones.
+    """
+    
+    WINDOW = 15  # frames (half a second at 30 FPS)
+    VICTORY_SCORE = 85
+    VICTORY_FRAMES = 10
+    
+    def __init__(self, window=None, victory_frames=None):
+        self.window = window or self.WINDOW
+        self.victory_frames = victory_frames or self.VICTORY_FRAMES
+        self._scores = np.zeros(self.window)
+        self._matched = [frozenset()] * self.window
+        self.reset()
+    
+    def reset(self, now=None):
+        """Clear history (new game or new shape)"""
+        self._scores[:] = 0.0
+        self._matched[:] = [frozenset()] * self.window
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._match_counts = {}
+        self._streak = 0  # consecutive frames disagreeing with the current state
+        self.victory = False
+        self.state_since = now if now is not None else time.time()
+    
+    @property
+    def smoothed_score(self) -> float:
+        """Mean score over the window"""
+        return self._sum / self._count if self._count else 0.0
+    
+    def time_in_state(self, now=None) -> float:
+        """Seconds since victory last started or ended"""
+        return (now if now is not None else time.time()) - self.state_since
+    
+    def stable_matched(self, min_fraction=0.5) -> set:
+        """Colors matched in at least min_fraction of the window"""
+        needed = max(1, min_fraction * self._count)
+        return {color for color, count in self._match_counts.items() if count >= needed}
+    
+    def push(self, score: float, matched_colors=frozenset(), now=None):
+        """
+        Record one frame. Returns 'victory' when a stable victory starts,
+        'lost' when it ends, else None.
+        """
+        now = now if now is not None else time.time()
+        i = self._index
+        
+        # Replace the oldest entry in place
+        if self._count == self.window:
+            self._sum -= self._scores[i]
+            for color in self._matched[i]:
+                self._match_counts[color] -= 1
+        else:
+            self._count += 1
+        matched_colors = frozenset(matched_colors)
+        self._scores[i] = score
+        self._matched[i] = matched_colors
+        self._sum += score
+        for color in matched_colors:
+            self._match_counts[color] = self._match_counts.get(color, 0) + 1
+        self._index = (i + 1) % self.window
+        
+        # Debounce: only flip state after enough consecutive disagreeing frames
+        qualifies = score >= self.VICTORY_SCORE
+        self._streak = self._streak + 1 if qualifies != self.victory else 0
+        if self._streak >= self.victory_frames:
+            self.victory = qualifies
+            self._streak = 0
+            self.state_since = now
+            return 'victory' if qualifies else 'lost'
+        return None
 
 
 class ScoreCalculator:
@@ -308,100 +1268,187 @@ class ScoreCalculator:
         Calculate matching score (0-100)
         Based on position and angle accuracy
         """
-        if not detected or not target:
-            return 0.0
-        
-        total_score = 0.0
-        matched_count = 0
-        
-        for target_piece in target:
-            best_match_score = 0.0
-            
-            for detected_piece in detected:
-                # Match by color first
-                if detected_piece.color != target_piece['color']:
-                    continue
-                
-                # Calculate position difference (normalized)
-                pos_diff = np.sqrt(
-                    (detected_piece.center[0] - target_piece['center'][0])**2 +
-                    (detected_piece.center[1] - target_piece['center'][1])**2
-                )
-                
-                # Position score (inverse of distance, max distance = 100 pixels)
-                pos_score = max(0, 100 - pos_diff) / 100.0
-                
-                # Calculate angle difference (normalized to 0-180)
-                angle_diff = abs(detected_piece.angle - target_piece['angle'])
-                angle_diff = min(angle_diff, 360 - angle_diff)
-                
-                # Angle score (allow 15 degree tolerance)
-                angle_score = max(0, 1 - angle_diff / 180.0)
-                
-                # Combined score (weighted average)
-                piece_score = (pos_score * 0.6 + angle_score * 0.4) * 100
-                
-                best_match_score = max(best_match_score, piece_score)
-            
-            if best_match_score > 30:  # Minimum threshold to count as matched
-                total_score += best_match_score
-                matched_count += 1
-        
-        # Average score across all target pieces
-        return total_score / len(target) if target else 0.0
+        return MatchEngine().match(detected, target).score
 
 
 class TangramGame:
     """Main game class managing the entire application"""
     
-    def __init__(self):
+    def __init__(self, detector=None, time_source=None, headless=False,
+                 window_size=(WINDOW_WIDTH, WINDOW_HEIGHT), fullscreen=False, watch_shapes=True,
+                 threaded_detection=True):
+        """
+        detector: anything with detect_pieces() and release() (default: camera)
+        time_source: callable returning seconds (default: time.time)
+        headless: render to an offscreen surface instead of a window
+        window_size: initial window size; the window can be resized freely
+        fullscreen: fill the screen, scaling the window_size layout (pygame.SCALED)
+        watch_shapes: reload the shape files when they change (not with a shape database)
+        threaded_detection: capture and detect on a worker thread; False detects
+            inside update() (deterministic, for scripted detectors and clocks)
+        """
         # Initialize display
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Tangram Challenge")
+        self.headless = headless
+        self.fullscreen = fullscreen
+        self.window_size = window_size
+        self._open_display(window_size)
         self.clock = pygame.time.Clock()
+        self.time = time_source or time.time
         
         # Initialize components
-        self.detector = TangramDetector()
+        self.detector = detector if detector is not None else TangramDetector()
         self.shape_library = ShapeLibrary()
-        self.score_calculator = ScoreCalculator()
+        self.match_engine = IncrementalMatchEngine()
+        self.scorers = {
+            'pose': self.match_engine,
+            'overlap': SilhouetteScorer(),
+            'anywhere': AlignedScorer(),
+        }
+        self.scoring_mode = 'pose'
+        # Free play reads the whole library, so its recognizer is built when first needed
+        self.recognizer = None
+        # Edits to the shape files are picked up without a restart
+        self.shape_watcher = None
+        if watch_shapes and self.shape_library.store is None:
+            self.shape_watcher = ShapeWatcher(self.shape_library.source_files,
+                                              self.shape_library.reload).start()
+        self.layout_checker = LayoutChecker()
+        self.stabilizer = ScoreStabilizer()
+        self.interpolator = PieceInterpolator()
+        self.camera_view = CameraView(self.CAMERA_VIEW_SIZE, PYGAME_COLORS, list(PIECE_COLORS))
+        # Session recording (V): the game screen, plus camera frames if available
+        self.screen_recorder = None
+        self.camera_recorder = None
+        self._next_record_time = 0.0
+        self._next_detection_time = 0.0
+        self.camera_frame = None  # Latest camera frame (BGR), if the detector has one
+        # Camera reads block for a frame interval, so by default they run off the render thread
+        self.detection_worker = None
+        if threaded_detection:
+            self.detection_worker = DetectionWorker(self.capture, DETECTION_FPS, self.time).start()
         
         # Game state
         self.current_shape = 'swan'
         self.detected_pieces = []
         self.score = 0.0
-        self.start_time = time.time()
+        self.start_time = self.time()
         self.game_duration = 180  # 3 minutes
         self.running = True
         self.paused = False
+        self.free_play = False
+        self.recognized_shape = None
+        self.status = None  # (message, time shown), see set_status()
         
         # UI elements
         self.font_large = pygame.font.Font(None, 48)
         self.font_medium = pygame.font.Font(None, 36)
         self.font_small = pygame.font.Font(None, 24)
+        # Target pieces are drawn as rotated polygons; set vector_targets to
+        # False to use the older rotate-and-blit sprites (kept in sprite_cache)
+        self.vector_targets = True
+        self._target_polygons = []
+        self._target_polygons_key = None
+        self.sprite_cache = SurfaceCache(max_size=128)
+        self.text_cache = TextCache(max_size=256)
+        self.score_digits = GlyphAtlas(self.font_large, "0123456789%", PYGAME_COLORS['black'])
+        self.timer_digits = GlyphAtlas(self.font_medium, "0123456789:", PYGAME_COLORS['black'])
+        
+        # Layered rendering: cached static background plus dirty rectangles
+        self.background = None
+        self._background_key_cached = None
+        self._dirty_rects = []
+        self._full_redraw = True
+        # Seconds spent in each part of the last draw()
+        self.draw_timings = dict.fromkeys(self.DRAW_SECTIONS, 0.0)
+        
+        # Display scaling - each target shape is fitted to the game area.
+        # Shape bounds are computed once per shape and the fitted transform
+        # once per shape and layout, so frames only look them up
+        self._shape_bounds = {}
+        self._display_transforms = {}
         
         # Layout
-        self.game_area = pygame.Rect(50, 100, 700, 650)
-        self.info_area = pygame.Rect(800, 100, 350, 650)
-        
-        # Display scaling - make target shapes bigger for 35" display
-        # Camera detection stays at 640x480, but display is scaled up
-        # Increase display_scale for larger displays (2.0 = 2x, 3.0 = 3x, etc.)
-        # Adjust display_offset to center the shape in the game area
-        self.display_scale = 1.5  # 1.5x larger for better visibility on 35" display
-        # Calculate offset to center scaled shape in game area
-        # Game area is 700x650, shape center is around (370, 250) in camera coords
-        # After scaling: (370*1.5, 250*1.5) = (555, 375)
-        # To center in game area: game_area.center - scaled_center + game_area.left
-        self.display_offset = (
-            50 + 700//2 - int(370 * self.display_scale),  # x offset
-            100 + 650//2 - int(250 * self.display_scale)   # y offset
-        )
+        self._layout(self.screen.get_size())
         
+    # Free play announces a shape once its recognition score reaches this
+    RECOGNITION_THRESHOLD = 50
+    # Free space left around a target shape, as a fraction of the game area
+    FIT_MARGIN = 0.1
+    # Seconds a status message stays on screen
+    STATUS_SECONDS = 4
+    # Camera picture-in-picture panel, shown in the game area's bottom-right corner
+    CAMERA_VIEW_SIZE = (240, 180)
+    # Parts of a frame timed by draw(); target covers the background layer
+    # (target shape and static panel), present the display update
+    DRAW_SECTIONS = ('target', 'detected', 'panel', 'overlay', 'present')
+    
+    def _open_display(self, size):
+        """Create the display surface (or the offscreen one when headless)"""
+        if self.headless:
+            self.screen = pygame.Surface(size)
+        elif self.fullscreen:
+            # SDL scales the fixed-size layout up to the whole screen
+            self.screen = pygame.display.set_mode(size, pygame.SCALED | pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+        pygame.display.set_caption("Tangram Challenge")
+    
+    def _layout(self, size):
+        """Place the game area and info panel for a window size"""
+        self.game_area, self.info_area = layout_areas(size)
+    
+    def resize(self, size):
+        """Adopt a new window size: re-layout and rebuild size-dependent caches"""
+        size = (max(size[0], self.MIN_WINDOW_SIZE[0]), max(size[1], self.MIN_WINDOW_SIZE[1]))
+        self.window_size = size
+        self._rebuild_display(size)
+    
+    def toggle_fullscreen(self):
+        """Switch between a resizable window and scaled fullscreen"""
+        self.fullscreen = not self.fullscreen
+        self._rebuild_display((WINDOW_WIDTH, WINDOW_HEIGHT) if self.fullscreen else self.window_size)
+    
+    def _rebuild_display(self, size):
+        """Reopen the display at size and drop everything laid out for the old one"""
+        self._open_display(size)
+        self._layout(size)
+        self._display_transforms.clear()
+        self.sprite_cache.clear()
+        self.background = None
+        self._full_redraw = True
+        self.invalidate_background()
+    
+    def display_transform(self, shape_key=None):
+        """(scale, offset) fitting a library shape to the game area, cached"""
+        shape_key = shape_key or self.current_shape
+        key = (shape_key, tuple(self.game_area))
+        transform = self._display_transforms.get(key)
+        if transform is None:
+            bounds = self._shape_bounds.get(shape_key)
+            if bounds is None:
+                bounds = shape_bounds(self.shape_library.shapes[shape_key]['pieces'])
+                self._shape_bounds[shape_key] = bounds
+            transform = fit_bounds(bounds, tuple(self.game_area), self.FIT_MARGIN)
+            self._display_transforms[key] = transform
+        return transform
+    
+    @property
+    def display_scale(self):
+        """Scale from shape coordinates to the screen for the current shape"""
+        return self.display_transform()[0]
+    
+    @property
+    def display_offset(self):
+        """Screen offset for the current shape (screen = point * scale + offset)"""
+        return self.display_transform()[1]
+    
     def handle_events(self):
         """Handle pygame events"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.VIDEORESIZE and not self.fullscreen:
+                self.resize(event.size)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
@@ -411,31 +1458,187 @@ class TangramGame:
                     self.reset_game()
                 elif event.key == pygame.K_n:
                     self.next_shape()
+                elif event.key == pygame.K_m:
+                    self.next_scoring_mode()
+                elif event.key == pygame.K_f:
+                    self.toggle_free_play()
+                elif event.key == pygame.K_F11:
+                    self.toggle_fullscreen()
+                elif event.key == pygame.K_d:
+                    self.next_camera_view()
+                elif event.key == pygame.K_v:
+                    self.toggle_recording()
     
     def update(self):
         """Update game state"""
+        if self.shape_watcher is not None:
+            reloaded = self.shape_watcher.take()
+            if reloaded is not None:
+                self.apply_shape_reload(*reloaded)
+        
         if self.paused:
             return
         
-        # Detect pieces from camera
-        self.detected_pieces = self.detector.detect_pieces()
+        # Pieces are detected at the detection rate; the display
+        # interpolates piece motion in between
+        if self.detection_worker is not None:
+            detection = self.detection_worker.take()
+            if detection is None:
+                return
+            (pieces, frame, labels), now = detection
+        else:
+            now = self.time()
+            if now < self._next_detection_time:
+                return
+            # Display frames don't line up with the detection interval: keep to
+            # the rate on average, without catching up after stalls
+            self._next_detection_time = max(self._next_detection_time + 1.0 / DETECTION_FPS, now)
+            pieces, frame, labels = self.capture()
+        self.detected_pieces = pieces
+        self.camera_frame = frame
+        self.interpolator.push(pieces, now)
+        if self.camera_recorder is not None and frame is not None:
+            self.camera_recorder.submit(frame)
+        if self.camera_view.enabled:
+            self.camera_view.update(frame, pieces, labels)
         
-        # Calculate score
+        # Free play: show whichever library shape the pieces look most like
+        if self.free_play:
+            shape_key, recognition_score = self.recognizer.recognize(self.detected_pieces)
+            if recognition_score >= self.RECOGNITION_THRESHOLD:
+                if shape_key != self.current_shape:
+                    self.stabilizer.reset(now)
+                self.recognized_shape = shape_key
+                self.current_shape = shape_key
+            else:
+                self.recognized_shape = None
+        
+        # Calculate score (results are cached for the matched-piece highlight)
         target_pieces = self.shape_library.shapes[self.current_shape]['pieces']
-        self.score = self.score_calculator.calculate_match(self.detected_pieces, target_pieces)
+        self.score = self.scorer.match(self.detected_pieces, target_pieces).score
+        
+        # Overlapping or floating pieces cannot score full marks
+        self.score *= self.layout_checker.check(self.detected_pieces).validity
+        
+        # Smooth the score and debounce victory against detection noise
+        event = self.stabilizer.push(self.score, self._get_matched_pieces(), now)
+        if event == 'victory':
+            print(f"Victory! {self.shape_library.shapes[self.current_shape]['name']} completed")
     
-    def draw_target_shape(self):
+    def capture(self):
+        """
+        Read and process one camera frame: (pieces, frame, label image).
+        Runs on the detection worker unless threaded_detection is off.
+        """
+        pieces = self.detector.detect_pieces()
+        frame = getattr(self.detector, 'last_frame', None)
+        labels = None
+        if getattr(self.detector, 'keep_labels', False) and self.detector.last_labels is not None:
+            labels = self.detector.last_labels.copy()  # The detector refills its buffer in place
+        return pieces, frame, labels
+    
+    def apply_shape_reload(self, shapes, changed):
+        """
+        Swap reloaded shapes into the library between frames, dropping what
+        was cached for changed shapes. The current shape and timer carry on.
+        """
+        if self.current_shape not in shapes:
+            print(f"Warning: {self.current_shape} was removed from the shape files; "
+                  f"keeping it until the next shape")
+            shapes[self.current_shape] = self.shape_library.shapes[self.current_shape]
+            changed.discard(self.current_shape)
+        self.shape_library.replace_shapes(shapes)
+        print(f"✓ Reloaded shapes: {len(changed)} changed")
+        if not changed:
+            return
+        
+        for key in changed:
+            self._shape_bounds.pop(key, None)
+        self._display_transforms = {
+            key: transform for key, transform in self._display_transforms.items() if key[0] not in changed
+        }
+        if self.recognizer is not None:
+            self.recognizer.update(shapes, changed)
+        for scorer in self.scorers.values():
+            scorer.invalidate()
+        if self.current_shape in changed:
+            self._target_polygons_key = None
+            self.stabilizer.reset(self.time())
+        self.invalidate_background()
+    
+    def next_camera_view(self):
+        """Cycle the camera picture-in-picture: off, camera frame, color labels"""
+        mode = self.camera_view.next_mode()
+        if hasattr(self.detector, 'keep_labels'):
+            self.detector.keep_labels = mode == 'labels'
+        print(f"Camera view: {mode}")
+    
+    def toggle_recording(self, directory="recordings"):
+        """Start or stop recording the session to video files in directory"""
+        if self.screen_recorder is not None:
+            self.stop_recording()
+            return
+        stem = os.path.join(directory, time.strftime("session_%Y%m%d_%H%M%S"))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.screen_recorder = VideoRecorder(f"{stem}.mp4", self.screen.get_size(), RECORD_FPS).start()
+            frame = self.camera_frame
+            if frame is not None:
+                size = (frame.shape[1], frame.shape[0])
+                self.camera_recorder = VideoRecorder(f"{stem}_camera.mp4", size, DETECTION_FPS).start()
+        except (IOError, OSError) as e:
+            print(f"Warning: Could not start recording: {e}")
+            self.set_status(f"Recording failed: {e}")
+            if self.screen_recorder is not None:
+                self.screen_recorder.stop()
+            self.screen_recorder = None
+            self.camera_recorder = None
+            return
+        print(f"Recording to {stem}.mp4")
+        self.set_status(f"Recording to {stem}.mp4")
+    
+    def stop_recording(self):
+        """Finish any recording in progress and report its stats"""
+        for recorder in (self.screen_recorder, self.camera_recorder):
+            if recorder is not None:
+                print(f"Recording saved: {recorder.stop()}")
+                self.set_status(f"Recording saved: {recorder.path}")
+        self.screen_recorder = None
+        self.camera_recorder = None
+    
+    def set_status(self, message):
+        """Show a message at the bottom of the game area for a few seconds"""
+        self.status = (message, self.time())
+    
+    @property
+    def scorer(self):
+        """Scorer for the active scoring mode"""
+        return self.scorers[self.scoring_mode]
+    
+    def draw_target_shape(self, surface=None):
         """Draw the target shape - matched pieces filled, unmatched as outlines"""
+        if surface is None:
+            surface = self.screen
         target_data = self.shape_library.shapes[self.current_shape]
         
         # Draw title
-        title_text = self.font_large.render(f"Make a {target_data['name']}!", True, PYGAME_COLORS['white'])
-        self.screen.blit(title_text, (self.game_area.centerx - title_text.get_width()//2, 20))
+        if not self.free_play:
+            title = f"Make a {target_data['name']}!"
+        elif self.recognized_shape:
+            title = f"You're building a {target_data['name']}!"
+        else:
+            title = "Free play: build anything!"
+        title_text = self.text_cache.render(self.font_large, title, PYGAME_COLORS['white'])
+        surface.blit(title_text, (self.game_area.centerx - title_text.get_width()//2, 20))
         
         # Calculate which pieces are matched
         matched_colors = self._get_matched_pieces()
         
-        # Draw target pieces with rotation
+        if self.vector_targets:
+            self._draw_target_vector(surface, target_data['pieces'], matched_colors)
+            return
+        
+        # Draw target pieces with rotation (rotated sprites are cached)
         for piece_data in target_data['pieces']:
             color = PYGAME_COLORS[piece_data['color']]
             # Apply display scaling to center position
@@ -450,65 +1653,24 @@ class TangramGame:
             # Check if this piece is matched
             is_matched = piece_color in matched_colors
             
-            # Determine size based on piece type (also scaled)
-            if 'large' in piece_type:
-                size = int(60 * self.display_scale)
-            elif 'medium' in piece_type:
-                size = int(45 * self.display_scale)
-            elif 'small' in piece_type:
-                size = int(30 * self.display_scale)
-            else:  # square or parallelogram
-                size = int(40 * self.display_scale)
-            
-            # Create surface for drawing rotated shape
-            surf_size = size * 3  # Large enough for rotation
-            surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA)
-            surf_center = surf_size // 2
-            
-            # Draw shape on surface
-            if 'triangle' in piece_type:
-                # Draw RIGHT-ANGLED triangle (matching shape editor)
-                points = [
-                    (surf_center - size//2, surf_center - size//2),
-                    (surf_center + size//2, surf_center - size//2),
-                    (surf_center - size//2, surf_center + size//2)
-                ]
-                if is_matched:
-                    # FILLED - piece is correctly placed!
-                    pygame.draw.polygon(surf, color, points, 0)
-                    pygame.draw.polygon(surf, (255, 255, 255), points, 2)
-                else:
-                    # OUTLINE ONLY - piece not matched yet
-                    pygame.draw.polygon(surf, color, points, 5)
-                
-            elif 'parallelogram' in piece_type:
-                # Draw parallelogram slanting LEFT
-                points = [
-                    (surf_center + size//2, surf_center - size//2),
-                    (surf_center - size//2, surf_center - size//2),
-                    (surf_center - size - size//2, surf_center + size//2),
-                    (surf_center - size//2, surf_center + size//2)
-                ]
-                if is_matched:
-                    pygame.draw.polygon(surf, color, points, 0)
-                    pygame.draw.polygon(surf, (255, 255, 255), points, 2)
-                else:
-                    pygame.draw.polygon(surf, color, points, 5)
-                
-            else:  # square
-                rect_pos = (surf_center - size//2, surf_center - size//2)
-                if is_matched:
-                    pygame.draw.rect(surf, color, (*rect_pos, size, size), 0)
-                    pygame.draw.rect(surf, (255, 255, 255), (*rect_pos, size, size), 2)
-                else:
-                    pygame.draw.rect(surf, color, (*rect_pos, size, size), 5)
-            
-            # Rotate surface (positive angle = counter-clockwise, matching shape editor)
-            rotated = pygame.transform.rotate(surf, angle)
+            key = (piece_type, color, angle, is_matched, self.display_scale)
+            rotated = self.sprite_cache.get(
+                key, lambda: render_piece_sprite(piece_type, color, angle, is_matched, self.display_scale))
             rotated_rect = rotated.get_rect(center=center)
             
             # Blit to screen
-            self.screen.blit(rotated, rotated_rect)
+            surface.blit(rotated, rotated_rect)
+    
+    def _draw_target_vector(self, surface, pieces, matched_colors):
+        """Draw target pieces as polygons from one batched vertex computation"""
+        key = (id(pieces), self.display_scale, self.display_offset)
+        if self._target_polygons_key != key:
+            self._target_polygons = target_polygons(pieces, self.display_scale, self.display_offset)
+            self._target_polygons_key = key
+        
+        for piece_data, points in zip(pieces, self._target_polygons):
+            is_matched = piece_data['color'] in matched_colors
+            draw_piece(surface, points, PYGAME_COLORS[piece_data['color']], filled=is_matched)
     
     def _get_matched_pieces(self):
         """
@@ -517,45 +1679,17 @@ class TangramGame:
         Note: Detected pieces are in camera coordinates (640x480)
         Target pieces are also in camera coordinates (before display scaling)
         """
-        target_data = self.shape_library.shapes[self.current_shape]
-        matched_colors = set()
-        
-        # Match threshold: position within 50 pixels and angle within 30 degrees
-        # These are in CAMERA COORDINATES (unscaled)
-        POSITION_THRESHOLD = 50
-        ANGLE_THRESHOLD = 30
-        
-        for target_piece in target_data['pieces']:
-            for detected_piece in self.detected_pieces:
-                # Must match color
-                if detected_piece.color != target_piece['color']:
-                    continue
-                
-                # Check position match (both in camera coordinates)
-                pos_diff = np.sqrt(
-                    (detected_piece.center[0] - target_piece['center'][0])**2 +
-                    (detected_piece.center[1] - target_piece['center'][1])**2
-                )
-                
-                if pos_diff > POSITION_THRESHOLD:
-                    continue
-                
-                # Check angle match
-                angle_diff = abs(detected_piece.angle - target_piece['angle'])
-                angle_diff = min(angle_diff, 360 - angle_diff)
-                
-                if angle_diff > ANGLE_THRESHOLD:
-                    continue
-                
-                # Both position and angle match!
-                matched_colors.add(target_piece['color'])
-                break
-        
-        return matched_colors
+        target_pieces = self.shape_library.shapes[self.current_shape]['pieces']
+        return self.scorer.match(self.detected_pieces, target_pieces).matched_colors
     
-    def draw_detected_pieces(self):
-        """Draw detected pieces as cartoon representations"""
-        for piece in self.detected_pieces:
+    def draw_detected_pieces(self, surface=None, pieces=None):
+        """Draw detected pieces as cartoon representations, returning the rects touched"""
+        if surface is None:
+            surface = self.screen
+        if pieces is None:
+            pieces = self.detected_pieces
+        rects = []
+        for piece in pieces:
             color = PYGAME_COLORS[piece.color]
             center = (int(piece.center[0]) + self.game_area.left, 
                      int(piece.center[1]) + self.game_area.top)
@@ -568,127 +1702,259 @@ class TangramGame:
                     (center[0] - size, center[1] + size),
                     (center[0] + size, center[1] + size)
                 ]
-                pygame.draw.polygon(self.screen, color, points)
-                pygame.draw.polygon(self.screen, PYGAME_COLORS['white'], points, 2)
+                rects.append(pygame.draw.polygon(surface, color, points))
+                rects.append(pygame.draw.polygon(surface, PYGAME_COLORS['white'], points, 2))
             else:
                 size = 25
-                pygame.draw.rect(self.screen, color, 
-                               (center[0]-size//2, center[1]-size//2, size, size))
-                pygame.draw.rect(self.screen, PYGAME_COLORS['white'],
-                               (center[0]-size//2, center[1]-size//2, size, size), 2)
+                rects.append(pygame.draw.rect(surface, color, 
+                               (center[0]-size//2, center[1]-size//2, size, size)))
+                rects.append(pygame.draw.rect(surface, PYGAME_COLORS['white'],
+                               (center[0]-size//2, center[1]-size//2, size, size), 2))
+        return rects
+    
+    def draw_engine_stats(self, pos, surface=None):
+        """Pose scoring's evaluated/skipped pairs per second, shown with the camera view"""
+        if surface is None:
+            surface = self.screen
+        engine = self.match_engine
+        text = self.text_cache.render(
+            self.font_small,
+            f"Scored {engine.evaluated_per_second:.0f}/s, skipped {engine.skipped_per_second:.0f}/s",
+            PYGAME_COLORS['white'])
+        return surface.blit(text, pos)
     
-    def draw_info_panel(self):
+    # Panel rows that change every frame: score, progress bar, timer, piece count
+    INFO_DYNAMIC_HEIGHT = 235
+    # Panel text below the dynamic rows: the scoring mode, then the instructions
+    INFO_TEXT_TOP = 240
+    INFO_LINE_HEIGHT = 24
+    INSTRUCTIONS = (
+        "Instructions:",
+        "Arrange the colored",
+        "tangram pieces to",
+        "match the target shape!",
+        "",
+        "Controls:",
+        "SPACE - Pause",
+        "R - Reset",
+        "N - Next shape",
+        "M - Scoring mode",
+        "F - Free play",
+        "F11 - Fullscreen",
+        "D - Camera view",
+        "V - Record",
+        "ESC - Quit"
+    )
+    # Smallest window the panel text fits in (the panel is 150 px shorter
+    # than the window, see layout_areas)
+    MIN_WINDOW_SIZE = (900, 150 + INFO_TEXT_TOP + (1 + len(INSTRUCTIONS)) * INFO_LINE_HEIGHT + 10)
+    
+    def draw_info_panel(self, surface=None):
         """Draw information panel with score and timer"""
+        self.draw_info_panel_static(surface)
+        self.draw_info_panel_dynamic(surface)
+    
+    def draw_info_panel_static(self, surface=None):
+        """Draw the parts of the information panel that rarely change"""
+        if surface is None:
+            surface = self.screen
+        
         # Background
-        pygame.draw.rect(self.screen, PYGAME_COLORS['light_gray'], self.info_area)
-        pygame.draw.rect(self.screen, PYGAME_COLORS['gray'], self.info_area, 3)
+        pygame.draw.rect(surface, PYGAME_COLORS['light_gray'], self.info_area)
+        pygame.draw.rect(surface, PYGAME_COLORS['gray'], self.info_area, 3)
+        
+        y_offset = self.info_area.top + self.INFO_TEXT_TOP
+        
+        # Scoring mode
+        mode_text = self.text_cache.render(self.font_small, f"Scoring: {self.scoring_mode.capitalize()}",
+                                           PYGAME_COLORS['black'])
+        surface.blit(mode_text, (self.info_area.left + 20, y_offset))
+        y_offset += self.INFO_LINE_HEIGHT
+        
+        # Instructions
+        for instruction in self.INSTRUCTIONS:
+            text = self.text_cache.render(self.font_small, instruction, PYGAME_COLORS['black'])
+            surface.blit(text, (self.info_area.left + 20, y_offset))
+            y_offset += self.INFO_LINE_HEIGHT
+    
+    def draw_info_panel_dynamic(self, surface=None):
+        """Draw score, progress bar, timer and piece count, returning the panel rect they use"""
+        if surface is None:
+            surface = self.screen
         
         y_offset = self.info_area.top + 20
+        score = self.stabilizer.smoothed_score
         
-        # Score
-        score_text = self.font_large.render(f"Score: {int(self.score)}%", True, PYGAME_COLORS['black'])
-        self.screen.blit(score_text, (self.info_area.left + 20, y_offset))
+        # Score (label from the text cache, digits from the glyph atlas)
+        label = self.text_cache.render(self.font_large, "Score: ", PYGAME_COLORS['black'])
+        surface.blit(label, (self.info_area.left + 20, y_offset))
+        self.score_digits.blit(surface, f"{int(score)}%", (self.info_area.left + 20 + label.get_width(), y_offset))
         y_offset += 70
         
         # Progress bar
         bar_width = 300
         bar_height = 30
         bar_rect = pygame.Rect(self.info_area.left + 25, y_offset, bar_width, bar_height)
-        pygame.draw.rect(self.screen, PYGAME_COLORS['white'], bar_rect)
-        fill_width = int(bar_width * (self.score / 100))
+        pygame.draw.rect(surface, PYGAME_COLORS['white'], bar_rect)
+        fill_width = int(bar_width * (score / 100))
         fill_rect = pygame.Rect(self.info_area.left + 25, y_offset, fill_width, bar_height)
         
         # Color based on score
-        if self.score >= 80:
+        if score >= 80:
             bar_color = (0, 255, 0)
-        elif self.score >= 50:
+        elif score >= 50:
             bar_color = (255, 165, 0)
         else:
             bar_color = (255, 0, 0)
         
-        pygame.draw.rect(self.screen, bar_color, fill_rect)
-        pygame.draw.rect(self.screen, PYGAME_COLORS['black'], bar_rect, 2)
+        pygame.draw.rect(surface, bar_color, fill_rect)
+        pygame.draw.rect(surface, PYGAME_COLORS['black'], bar_rect, 2)
         y_offset += 60
         
         # Timer
-        elapsed = time.time() - self.start_time
+        elapsed = self.time() - self.start_time
         remaining = max(0, self.game_duration - elapsed)
         minutes = int(remaining // 60)
         seconds = int(remaining % 60)
         
-        timer_text = self.font_medium.render(f"Time: {minutes:02d}:{seconds:02d}", True, PYGAME_COLORS['black'])
-        self.screen.blit(timer_text, (self.info_area.left + 20, y_offset))
+        label = self.text_cache.render(self.font_medium, "Time: ", PYGAME_COLORS['black'])
+        surface.blit(label, (self.info_area.left + 20, y_offset))
+        self.timer_digits.blit(surface, f"{minutes:02d}:{seconds:02d}",
+                               (self.info_area.left + 20 + label.get_width(), y_offset))
         y_offset += 60
         
         # Detected pieces count
-        count_text = self.font_small.render(f"Pieces detected: {len(self.detected_pieces)}/7", 
-                                           True, PYGAME_COLORS['black'])
-        self.screen.blit(count_text, (self.info_area.left + 20, y_offset))
-        y_offset += 80
-        
-        # Instructions
-        instructions = [
-            "Instructions:",
-            "",
-            "Arrange the colored",
-            "tangram pieces to",
-            "match the target shape!",
-            "",
-            "Controls:",
-            "SPACE - Pause",
-            "R - Reset",
-            "N - Next shape",
-            "ESC - Quit"
-        ]
+        count_text = self.text_cache.render(self.font_small, f"Pieces detected: {len(self.detected_pieces)}/7",
+                                            PYGAME_COLORS['black'])
+        surface.blit(count_text, (self.info_area.left + 20, y_offset))
         
-        for instruction in instructions:
-            text = self.font_small.render(instruction, True, PYGAME_COLORS['black'])
-            self.screen.blit(text, (self.info_area.left + 20, y_offset))
-            y_offset += 30
+        return pygame.Rect(self.info_area.left + 3, self.info_area.top + 3,
+                           self.info_area.width - 6, self.INFO_DYNAMIC_HEIGHT)
     
-    def draw(self):
-        """Draw everything"""
+    def _background_key(self):
+        """Everything the cached background layer depends on"""
+        target_pieces = self.shape_library.shapes[self.current_shape]['pieces']
+        return (
+            self.current_shape, id(target_pieces), frozenset(self._get_matched_pieces()),
+            self.display_scale, self.display_offset, self.free_play, self.recognized_shape,
+            self.scoring_mode, self.screen.get_size()
+        )
+    
+    def _build_background(self):
+        """Compose the static layer: frames, target shape and panel text"""
+        if self.background is None or self.background.get_size() != self.screen.get_size():
+            self.background = self.screen.copy()
+        
         # Clear screen
-        self.screen.fill(PYGAME_COLORS['black'])
+        self.background.fill(PYGAME_COLORS['black'])
         
         # Draw game area background
-        pygame.draw.rect(self.screen, (40, 40, 40), self.game_area)
-        pygame.draw.rect(self.screen, PYGAME_COLORS['white'], self.game_area, 3)
+        pygame.draw.rect(self.background, (40, 40, 40), self.game_area)
+        pygame.draw.rect(self.background, PYGAME_COLORS['white'], self.game_area, 3)
         
         # Draw target shape
-        self.draw_target_shape()
+        self.draw_target_shape(self.background)
+        
+        # Draw static part of the info panel
+        self.draw_info_panel_static(self.background)
+    
+    def invalidate_background(self):
+        """Force the background layer to be rebuilt on the next frame"""
+        self._background_key_cached = None
+    
+    def draw(self):
+        """
+        Draw everything. Static content lives in a cached background layer
+        that is rebuilt only when it changes (new shape, newly matched pieces,
+        mode switch); other frames restore last frame's dirty regions from it,
+        redraw the dynamic parts and push only those rects to the display.
+        """
+        timings = self.draw_timings
+        start = time.perf_counter()
+        key = self._background_key()
+        full_redraw = self.paused or self._full_redraw or key != self._background_key_cached
+        if key != self._background_key_cached:
+            self._build_background()
+            self._background_key_cached = key
+        
+        if full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self._dirty_rects:
+                self.screen.blit(self.background, rect, rect)
         
-        # Draw detected pieces
-        self.draw_detected_pieces()
+        mark = time.perf_counter()
+        timings['target'] = mark - start
+        
+        # Draw detected pieces, posed between the last two detections
+        dirty = self.draw_detected_pieces(pieces=self.interpolator.sample(self.time()))
+        if self.camera_view.enabled:
+            width, height = self.CAMERA_VIEW_SIZE
+            left, top = self.game_area.right - width - 10, self.game_area.bottom - height - 10
+            dirty.append(self.camera_view.draw(self.screen, (left, top)))
+            dirty.append(self.draw_engine_stats((left, top - 24)))
+        start, mark = mark, time.perf_counter()
+        timings['detected'] = mark - start
         
         # Draw info panel
-        self.draw_info_panel()
+        dirty.append(self.draw_info_panel_dynamic())
+        start, mark = mark, time.perf_counter()
+        timings['panel'] = mark - start
         
         # Draw pause overlay
         if self.paused:
-            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+            overlay = pygame.Surface(self.screen.get_size())
             overlay.set_alpha(128)
             overlay.fill((0, 0, 0))
             self.screen.blit(overlay, (0, 0))
             
-            pause_text = self.font_large.render("PAUSED", True, PYGAME_COLORS['white'])
+            pause_text = self.text_cache.render(self.font_large, "PAUSED", PYGAME_COLORS['white'])
             self.screen.blit(pause_text, 
-                           (WINDOW_WIDTH//2 - pause_text.get_width()//2,
-                            WINDOW_HEIGHT//2 - pause_text.get_height()//2))
+                           (self.screen.get_width()//2 - pause_text.get_width()//2,
+                            self.screen.get_height()//2 - pause_text.get_height()//2))
         
-        # Victory check
-        if self.score >= 85:
-            victory_text = self.font_large.render("GREAT JOB!", True, (255, 215, 0))
-            self.screen.blit(victory_text,
+        # Victory check (debounced over several frames)
+        if self.stabilizer.victory:
+            victory_text = self.text_cache.render(self.font_large, "GREAT JOB!", (255, 215, 0))
+            dirty.append(self.screen.blit(victory_text,
                            (self.game_area.centerx - victory_text.get_width()//2,
-                            self.game_area.centery - 50))
+                            self.game_area.centery - 50)))
+        
+        if self.status is not None:
+            message, shown = self.status
+            if self.time() - shown < self.STATUS_SECONDS:
+                status_text = self.text_cache.render(self.font_small, message, PYGAME_COLORS['white'])
+                dirty.append(self.screen.blit(status_text, (self.game_area.left + 10,
+                                                            self.game_area.bottom - status_text.get_height() - 10)))
+            else:
+                self.status = None
+        
+        start, mark = mark, time.perf_counter()
+        timings['overlay'] = mark - start
         
-        pygame.display.flip()
+        if not self.headless:  # Headless frames stay on the offscreen surface
+            if full_redraw:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self._dirty_rects + dirty)
+        timings['present'] = time.perf_counter() - mark
+        
+        # Copy the finished frame for the recorder (encoded on its own thread)
+        if self.screen_recorder is not None:
+            now = self.time()
+            if now >= self._next_record_time:
+                # Keep to the video's frame rate on average, without catching up after stalls
+                self._next_record_time = max(self._next_record_time + 1.0 / RECORD_FPS, now)
+                self.screen_recorder.submit_surface(self.screen)
+        self._dirty_rects = dirty
+        # The pause overlay covers everything, so the frame after it is drawn in full
+        self._full_redraw = self.paused
     
     def reset_game(self):
         """Reset game state"""
-        self.start_time = time.time()
+        self.start_time = self.time()
         self.score = 0.0
+        self.stabilizer.reset(self.time())
     
     def next_shape(self):
         """Switch to next shape"""
@@ -697,6 +1963,20 @@ class TangramGame:
         self.current_shape = shapes[(current_index + 1) % len(shapes)]
         self.reset_game()
     
+    def toggle_free_play(self):
+        """Switch between building the current shape and free-play recognition"""
+        self.free_play = not self.free_play
+        self.recognized_shape = None
+        if self.free_play and self.recognizer is None:
+            self.recognizer = ShapeRecognizer(self.shape_library.shapes)
+        print(f"Free play: {'on' if self.free_play else 'off'}")
+    
+    def next_scoring_mode(self):
+        """Switch to next scoring mode"""
+        modes = list(self.scorers.keys())
+        self.scoring_mode = modes[(modes.index(self.scoring_mode) + 1) % len(modes)]
+        print(f"Scoring mode: {self.scoring_mode}")
+    
     def run(self):
         """Main game loop"""
         while self.running:
@@ -709,6 +1989,15 @@ class TangramGame:
     
     def cleanup(self):
         """Clean up resources"""
+        self.stop_recording()
+        if self.shape_watcher is not None:
+            self.shape_watcher.stop()
+        if self.detection_worker is not None:
+            self.detection_worker.stop()  # Before the camera is released
+        engine = self.match_engine
+        print(f"Piece evaluations: {engine.evaluated} scored, {engine.skipped} skipped (pose unchanged)")
+        print(f"Sprite cache: {self.sprite_cache.stats()}")
+        print(f"Text cache: {self.text_cache.stats()}")
         self.detector.release()
         pygame.quit()
 
@@ -721,6 +2010,11 @@ def main():
     print("  SPACE - Pause/Resume")
     print("  R - Reset timer")
     print("  N - Next shape")
+    print("  M - Scoring mode")
+    print("  F - Free play")
+    print("  F11 - Toggle fullscreen")
+    print("  D - Camera view (off / camera / color labels)")
+    print("  V - Record session video")
     print("  ESC - Quit")
     print("\nStarting in 3 seconds...")
     time.sleep(3)
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Tangram Geometry - canonical piece outlines and batched pose transforms
+Shared by scoring, rendering and shape tools (NumPy only, no display needed)
+"""
+
+import numpy as np
+import cv2
+from typing import Dict, Sequence, Tuple
+
+# Import piece sizes from the shape configuration
+try:
+    from shapes_config import PIECE_SIZES
+except ImportError:
+    PIECE_SIZES = {
+        "large_triangle": 60,
+        "medium_triangle": 45,
+        "small_triangle": 30,
+        "square": 40,
+        "parallelogram": 40
+    }
+
+# Piece outlines in units of the piece size, relative to the rotation center,
+# in screen coordinates (y points down). These match what draw_target_shape
+# renders: a right-angled triangle with the right angle top-left, a square,
+# and a parallelogram slanting LEFT. Triangles repeat their last vertex so
+# every outline has four vertices and a whole shape packs into one array.
+TRIANGLE_OUTLINE = np.array([(-0.5, -0.5), (0.5, -0.5), (-0.5, 0.5), (-0.5, 0.5)])
+SQUARE_OUTLINE = np.array([(-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)])
+PARALLELOGRAM_OUTLINE = np.array([(0.5, -0.5), (-0.5, -0.5), (-1.5, 0.5), (-0.5, 0.5)])
+
+
+def piece_outline(piece_type: str) -> np.ndarray:
+    """Outline of a piece type in pixels (before rotation), shape (4, 2)"""
+    if 'triangle' in piece_type:
+        base = TRIANGLE_OUTLINE
+    elif 'parallelogram' in piece_type:
+        base = PARALLELOGRAM_OUTLINE
+    else:  # square
+        base = SQUARE_OUTLINE
+    return base * piece_size(piece_type)
+
+
+def piece_size(piece_type: str) -> int:
+    """Rendering size of a piece type (same fallbacks as draw_target_shape)"""
+    if piece_type in PIECE_SIZES:
+        return PIECE_SIZES[piece_type]
+    if 'large' in piece_type:
+        return 60
+    elif 'medium' in piece_type:
+        return 45
+    elif 'small' in piece_type:
+        return 30
+    return 40
+
+
+def rotation_matrices(angles) -> np.ndarray:
+    """
+    Rotation matrices for angles in degrees, shape (N, 2, 2).
+    Positive angles turn counter-clockwise on screen, like pygame.transform.rotate.
+    """
+    theta = np.radians(np.asarray(angles, dtype=np.float64))
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    # Row vectors are multiplied on the left: [x, y] @ R
+    return np.stack([
+        np.stack([cos_t, -sin_t], axis=-1),
+        np.stack([sin_t, cos_t], axis=-1)
+    ], axis=-2)
+
+
+def piece_polygons(piece_types: Sequence[str], centers, angles, scale: float = 1.0) -> np.ndarray:
+    """Vertices of all pieces in one batch, shape (N, 4, 2)"""
+    if len(piece_types) == 0:
+        return np.zeros((0, 4, 2))
+    outlines = np.stack([piece_outline(t) for t in piece_types]) * scale
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 1, 2)
+    return outlines @ rotation_matrices(angles) + centers
+
+
+def shape_polygons(pieces: Sequence[Dict], scale: float = 1.0) -> np.ndarray:
+    """Vertices of every piece in a shapes_config-style piece list"""
+    return piece_polygons(
+        [p.get('piece_type', '') for p in pieces],
+        [p['center'] for p in pieces],
+        [p.get('angle', 0) for p in pieces],
+        scale
+    )
+
+
+def shape_bounds(pieces: Sequence[Dict]) -> Tuple[float, float, float, float]:
+    """Bounding box (x0, y0, x1, y1) of a shape's piece outlines at scale 1"""
+    if not pieces:
+        return (0.0, 0.0, 0.0, 0.0)
+    vertices = shape_polygons(pieces).reshape(-1, 2)
+    x0, y0 = vertices.min(axis=0)
+    x1, y1 = vertices.max(axis=0)
+    return (float(x0), float(y0), float(x1), float(y1))
+
+
+def fit_bounds(bounds, rect, margin: float = 0.1) -> Tuple[float, Tuple[float, float]]:
+    """
+    Uniform scale and offset that fit bounds (x0, y0, x1, y1) centered
+    inside rect (x, y, w, h), leaving margin (a fraction of the rect) free
+    on every side: screen = point * scale + offset
+    """
+    x0, y0, x1, y1 = bounds
+    x, y, w, h = rect
+    width = max(x1 - x0, 1e-6)
+    height = max(y1 - y0, 1e-6)
+    scale = min(w * (1 - 2 * margin) / width, h * (1 - 2 * margin) / height)
+    offset = (
+        x + w / 2 - scale * (x0 + x1) / 2,
+        y + h / 2 - scale * (y0 + y1) / 2
+    )
+    return scale, offset
+
+
+class SilhouetteRasterizer:
+    """Rasterizes polygons in camera coordinates onto a low-resolution grid"""
+
+    def __init__(self, frame_size: Tuple[int, int] = (640, 480), cell_size: int = 4):
+        self.cell_size = cell_size
+        self.grid_size = (
+            (frame_size[0] + cell_size - 1) // cell_size,
+            (frame_size[1] + cell_size - 1) // cell_size
+        )
+
+    def blank(self) -> np.ndarray:
+        """Empty grid (uint8, rows x cols)"""
+        return np.zeros((self.grid_size[1], self.grid_size[0]), dtype=np.uint8)
+
+    def to_grid(self, polygon) -> np.ndarray:
+        """Convert a camera-space polygon to int32 grid vertices for cv2.fillPoly"""
+        points = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        return np.round(points / self.cell_size).astype(np.int32)
+
+    def fill(self, grid: np.ndarray, polygons, value: int = 255) -> np.ndarray:
+        """Fill polygons into an existing grid"""
+        if len(polygons):
+            cv2.fillPoly(grid, [self.to_grid(p) for p in polygons], value)
+        return grid
+
+
+def fit_similarity(src, dst, with_scale: bool = True) -> Tuple[float, float, np.ndarray]:
+    """
+    Closed-form least-squares similarity transform (Umeyama, 2D) mapping
+    src points onto dst points: dst ~ scale * R(angle) @ src + translation.
+    Returns (scale, angle in degrees, translation). Reflections are excluded.
+    The angle is in the matrix sense; with y pointing down it turns clockwise
+    on screen, so piece angles (counter-clockwise) change by -angle.
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(-1, 2)
+    src_mean = src.mean(axis=0)
+    dst_mean = dst.mean(axis=0)
+    sx, sy = (src - src_mean).T
+    dx, dy = (dst - dst_mean).T
+    
+    # In 2D the optimal rotation comes straight from the summed dot and cross products
+    dot = float(sx @ dx + sy @ dy)
+    cross = float(sx @ dy - sy @ dx)
+    theta = np.arctan2(cross, dot)
+    
+    scale = 1.0
+    if with_scale:
+        spread = float(sx @ sx + sy @ sy)
+        if spread > 1e-9:
+            scale = float(np.hypot(dot, cross)) / spread
+    
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    translation = dst_mean - scale * np.array([
+        cos_t * src_mean[0] - sin_t * src_mean[1],
+        sin_t * src_mean[0] + cos_t * src_mean[1]
+    ])
+    return scale, float(np.degrees(theta)), translation
+
+
+def apply_similarity(points, scale: float, angle: float, translation) -> np.ndarray:
+    """Apply a transform returned by fit_similarity to points, shape (N, 2)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    theta = np.radians(angle)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    rotation = np.array([[cos_t, sin_t], [-sin_t, cos_t]])  # transposed for row vectors
+    return scale * points @ rotation + np.asarray(translation)
+
+
+def polygon_area(polygon) -> float:
+    """Signed area of a polygon given as a list of (x, y) (shoelace formula)"""
+    area = 0.0
+    n = len(polygon)
+    for i in range(n):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[(i + 1) % n]
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+def convex_outline(points) -> list:
+    """
+    Convex outline of a contour or vertex array as a list of (x, y) tuples
+    with positive signed area, simplified to a handful of vertices
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    hull = cv2.convexHull(points)
+    epsilon = 0.02 * cv2.arcLength(hull, True)
+    simplified = cv2.approxPolyDP(hull, epsilon, True)
+    if len(simplified) >= 3:
+        hull = simplified
+    outline = [(float(x), float(y)) for x, y in hull.reshape(-1, 2)]
+    if polygon_area(outline) < 0:
+        outline.reverse()
+    return outline
+
+
+def chirality(outline) -> int:
+    """
+    Handedness of a parallelogram outline with positive signed area (as
+    returned by convex_outline): +1 or -1, changing sign when the piece is
+    turned over. 0 for outlines without one (triangles, squares, rhombi,
+    rectangles), so only a measured flip ever counts.
+    """
+    if len(outline) != 4:
+        return 0
+    (ax, ay), (bx, by), (cx, cy) = outline[:3]
+    e0, e1 = (bx - ax, by - ay), (cx - bx, cy - by)
+    l0, l1 = np.hypot(*e0), np.hypot(*e1)
+    if min(l0, l1) == 0 or abs(l0 - l1) < 0.1 * max(l0, l1):
+        return 0
+    turn = (e0[0] * e1[0] + e0[1] * e1[1]) / (l0 * l1)
+    if abs(turn) < 0.2:
+        return 0
+    # Whether the sharp corner follows a long edge or a short one
+    sign = 1 if turn > 0 else -1
+    return sign if l0 > l1 else -sign
+
+
+def convex_intersection_area(subject, clipper) -> float:
+    """
+    Overlap area of two convex polygons (Sutherland-Hodgman clipping).
+    Both must have positive signed area, as returned by convex_outline.
+    Plain Python floats: for 3-6 vertices this beats NumPy's call overhead.
+    """
+    output = list(subject)
+    n = len(clipper)
+    for i in range(n):
+        if not output:
+            return 0.0
+        ax, ay = clipper[i]
+        bx, by = clipper[(i + 1) % n]
+        ex, ey = bx - ax, by - ay
+        polygon = output
+        output = []
+        px, py = polygon[-1]
+        p_inside = ex * (py - ay) - ey * (px - ax) >= 0
+        for qx, qy in polygon:
+            q_inside = ex * (qy - ay) - ey * (qx - ax) >= 0
+            if q_inside != p_inside:
+                # Edge crosses the clip line: add the intersection point
+                dx, dy = qx - px, qy - py
+                denom = ex * dy - ey * dx
+                if denom != 0:
+                    t = (ey * (px - ax) - ex * (py - ay)) / denom
+                    output.append((px + t * dx, py + t * dy))
+            if q_inside:
+                output.append((qx, qy))
+            px, py, p_inside = qx, qy, q_inside
+    return abs(polygon_area(output)) if len(output) >= 3 else 0.0
+
+
+def _point_segment_distance(px, py, ax, ay, bx, by) -> float:
+    """Distance from a point to a line segment"""
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    cx, cy = ax + t * dx, ay + t * dy
+    return ((px - cx) ** 2 + (py - cy) ** 2) ** 0.5
+
+
+def convex_gap(a, b) -> float:
+    """Smallest distance between two disjoint convex polygons (0 if they touch)"""
+    best = float('inf')
+    for poly, other in ((a, b), (b, a)):
+        n = len(other)
+        for px, py in poly:
+            for i in range(n):
+                ax, ay = other[i]
+                bx, by = other[(i + 1) % n]
+                best = min(best, _point_segment_distance(px, py, ax, ay, bx, by))
+    return best
+
+
+def sweep_pairs(boxes, margin: float = 0.0) -> list:
+    """
+    Broad phase: index pairs whose bounding boxes (x0, y0, x1, y1) overlap
+    once grown by margin, found by sort-and-sweep along x
+    """
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i][0])
+    active = []
+    pairs = []
+    for i in order:
+        x0, y0, x1, y1 = boxes[i]
+        active = [j for j in active if boxes[j][2] + margin >= x0]
+        for j in active:
+            if boxes[j][1] - margin <= y1 and y0 <= boxes[j][3] + margin:
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    return pairs
@@ -49,6 +49,22 @@ print(f"   ✓ PIECE_SIZES has {len(PIECE_SIZES)} entries")
 for piece_type, size in PIECE_SIZES.items():
     print(f"   - {piece_type}: {size}px")
 
+# Test that editor dumps import with the editor's piece colors
+print(f"\n4. Testing editor dump import (swan)...")
+from shape_schema import load_shape_file
+imported = load_shape_file('shape_swan_20251115_224357.json')['swan']['pieces']
+config = all_shapes['swan']['pieces']
+assert sorted(p['color'] for p in imported) == sorted(p['color'] for p in config), "Imported swan colors differ"
+head = min(imported, key=lambda p: p['center'][1])
+config_head = min(config, key=lambda p: p['center'][1])
+assert (head['color'], head['piece_type']) == (config_head['color'], config_head['piece_type']), \
+    f"Imported swan head is {head['color']} {head['piece_type']}, shapes_config has {config_head['color']}"
+for piece_type in ('medium_triangle', 'parallelogram'):
+    imported_color = [p['color'] for p in imported if p['piece_type'] == piece_type]
+    config_color = [p['color'] for p in config if p['piece_type'] == piece_type]
+    assert imported_color == config_color, f"Imported swan {piece_type} is {imported_color}, expected {config_color}"
+print(f"   ✓ Head is the {head['color']} {head['piece_type']}, as in shapes_config")
+
 print("\n" + "="*60)
 print("✅ ALL TESTS PASSED!")
 print("shapes_config.py is fully compatible with tangram_game.py")
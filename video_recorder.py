@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Video recorder
+Encodes frames to a video file on a background thread. The game loop
+only copies pixels into a bounded queue; when the encoder falls behind,
+new frames are dropped instead of stalling the game.
+"""
+
+import queue
+import sys
+import threading
+
+import cv2
+import numpy as np
+import pygame
+
+
+class VideoRecorder:
+    """
+    Background cv2.VideoWriter fed through a bounded queue.
+    submit() takes BGR frames (camera frames as they come from OpenCV);
+    submit_surface() takes a pygame surface. Both return False when the
+    frame had to be dropped.
+    """
+
+    STOP_TIMEOUT = 5.0  # Seconds stop() waits for the encoder to take the stop marker, and to finish
+
+    def __init__(self, path, size, fps=30, max_queue=32, fourcc='mp4v'):
+        self.path = path
+        self.size = tuple(size)
+        self.fps = fps
+        self.max_queue = max_queue
+        self.fourcc = fourcc
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._writer = None
+        self._abandoned = False  # Set by stop() when the encoder couldn't take the stop marker
+
+    def start(self):
+        """Open the output file and start the encoder thread"""
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.size)
+        if not self._writer.isOpened():
+            self._writer.release()
+            raise IOError(f"Could not open video writer for {self.path}")
+        self._abandoned = False
+        self._thread = threading.Thread(target=self._encode, args=(self._writer,), name="VideoRecorder",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def recording(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, frame) -> bool:
+        """Queue a BGR frame; drops it if the encoder is behind"""
+        return self._put(frame, None)
+
+    def submit_surface(self, surface) -> bool:
+        """Queue a copy of a pygame surface; drops it if the encoder is behind"""
+        if not self.recording:
+            return False
+        if self._queue.full():
+            # Don't even copy the pixels when the frame would be dropped
+            self.submitted += 1
+            self.dropped += 1
+            return False
+        if surface.get_bitsize() == 32 and sys.byteorder == 'little':
+            # One contiguous copy of the 32-bit pixels; channel reordering
+            # happens on the encoder thread
+            pixels = pygame.surfarray.pixels2d(surface)
+            frame = np.array(pixels.T)
+            del pixels  # Unlock the surface
+            order = [shift // 8 for shift in surface.get_shifts()[2::-1]]  # B, G, R byte offsets
+            return self._put(frame, order)
+        frame = pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+        return self._put(frame, [2, 1, 0])
+
+    def _put(self, frame, order) -> bool:
+        if not self.recording:
+            return False
+        self.submitted += 1
+        try:
+            self._queue.put_nowait((frame, order))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _encode(self, writer):
+        """Encoder thread: convert and write frames until the stop marker, then close the file"""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None or self._abandoned:
+                    break
+                frame, order = item
+                if order is not None:
+                    if frame.dtype == np.uint32:
+                        frame = frame.view(np.uint8).reshape(frame.shape + (4,))
+                    frame = np.ascontiguousarray(frame[..., order])
+                if (frame.shape[1], frame.shape[0]) != self.size:
+                    frame = cv2.resize(frame, self.size)  # Window was resized mid-recording
+                writer.write(frame)
+                self.written += 1
+        finally:
+            # Only this thread writes, so only it may release the writer
+            writer.release()
+
+    def stop(self):
+        """Flush queued frames, close the file and return the stats line"""
+        # The encoder thread closes the file itself, also when it died early
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=self.STOP_TIMEOUT)
+            except queue.Full:
+                # Stuck or far behind: stop after the frame being encoded
+                self._abandoned = True
+                print(f"Warning: Video encoder for {self.path} is not responding; queued frames are lost")
+            self._thread.join(self.STOP_TIMEOUT)
+            if self._thread.is_alive():
+                print(f"Warning: Video encoder for {self.path} is still running; "
+                      f"it closes the file when it finishes")
+        self._thread = None
+        return self.stats()
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.submitted if self.submitted else 0.0
+
+    def stats(self) -> str:
+        """One-line summary for logs"""
+        return (f"{self.path}: {self.written} frames written, {self.dropped} dropped "
+                f"({self.drop_rate:.0%}), queue depth {self.queue_depth}/{self.max_queue} "
+                f"(max {self.max_depth})")
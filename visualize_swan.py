@@ -6,6 +6,7 @@ import sys
 
 # Import the shape config
 from shapes_config import SHAPES
+from piece_renderer import target_polygons, draw_piece
 
 # Initialize Pygame
 pygame.init()
@@ -29,6 +30,9 @@ pygame.display.set_caption("Swan Shape Visualization")
 # Get swan shape
 swan = SHAPES['swan']
 
+# Rotated piece vertices, computed once for all pieces
+swan_polygons = target_polygons(swan['pieces'])
+
 # Draw the swan
 running = True
 while running:
@@ -48,58 +52,13 @@ while running:
     screen.blit(title, (WIDTH//2 - title.get_width()//2, 20))
     
     # Draw each piece
-    for piece_data in swan['pieces']:
+    for piece_data, points in zip(swan['pieces'], swan_polygons):
         color = PYGAME_COLORS[piece_data['color']]
         center = piece_data['center']
         angle = piece_data.get('angle', 0)
-        piece_type = piece_data.get('piece_type', '')
-        
-        # Determine size
-        if 'large' in piece_type:
-            size = 60
-        elif 'medium' in piece_type:
-            size = 45
-        elif 'small' in piece_type:
-            size = 30
-        else:
-            size = 40
-        
-        # Create surface for rotation
-        surf_size = size * 3
-        surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA)
-        surf_center = surf_size // 2
-        
-        # Draw shape
-        if 'triangle' in piece_type:
-            # RIGHT-ANGLED triangle (matching shape editor)
-            points = [
-                (surf_center - size//2, surf_center - size//2),  # Top-left (right angle)
-                (surf_center + size//2, surf_center - size//2),  # Top-right
-                (surf_center - size//2, surf_center + size//2)   # Bottom-left
-            ]
-            pygame.draw.polygon(surf, color, points, 0)  # Filled
-            pygame.draw.polygon(surf, (255, 255, 255), points, 2)  # White outline
-            
-        elif 'parallelogram' in piece_type:
-            # Parallelogram slanting LEFT (matching shape editor)
-            points = [
-                (surf_center + size//2, surf_center - size//2),
-                (surf_center - size//2, surf_center - size//2),
-                (surf_center - size - size//2, surf_center + size//2),
-                (surf_center - size//2, surf_center + size//2)
-            ]
-            pygame.draw.polygon(surf, color, points, 0)
-            pygame.draw.polygon(surf, (255, 255, 255), points, 2)
-            
-        else:  # square
-            rect_pos = (surf_center - size//2, surf_center - size//2)
-            pygame.draw.rect(surf, color, (*rect_pos, size, size), 0)  # Filled
-            pygame.draw.rect(surf, (255, 255, 255), (*rect_pos, size, size), 2)  # White outline
         
-        # Rotate and draw (positive angle = counter-clockwise)
-        rotated = pygame.transform.rotate(surf, angle)
-        rotated_rect = rotated.get_rect(center=center)
-        screen.blit(rotated, rotated_rect)
+        # Draw the rotated polygon (positive angle = counter-clockwise)
+        draw_piece(screen, points, color, filled=True)
         
         # Draw center point and label
         pygame.draw.circle(screen, (255, 255, 255), center, 3)